@@ -16,25 +16,57 @@ You should have received a copy of the GNU Affero General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+# Importato per primo: misura anche il caricamento degli altri moduli
+from src.startup_profiler import profiler
+profiler.begin("imports")
+
 import sys
 from PyQt5.QtWidgets import QApplication
 from src.gui import MainWindow
+from src.single_instance import SingleInstance, SHOW_COMMAND, REFRESH_COMMAND
 import argparse
 
+profiler.end("imports")
+
 if __name__ == "__main__":
     # Parsing degli argomenti da linea di comando
     parser = argparse.ArgumentParser()
     parser.add_argument('--minimized', action='store_true', 
                        help="Avvia l'app minimizzata nel system tray")
+    parser.add_argument('--refresh', action='store_true',
+                       help="Aggiorna subito i dati (anche nell'istanza già in esecuzione)")
+    parser.add_argument('--profile-startup', action='store_true',
+                       help="Stampa la durata delle fasi di avvio")
     args = parser.parse_args()
     
+    if args.profile_startup:
+        profiler.enable()
+    
     app = QApplication(sys.argv)
     app.setStyle("Fusion")  # Tema di default
     
+    # Se Glik è già in esecuzione passa i comandi all'istanza esistente
+    instance = SingleInstance()
+    commands = []
+    if not args.minimized:
+        commands.append(SHOW_COMMAND)
+    if args.refresh:
+        commands.append(REFRESH_COMMAND)
+    if instance.send_to_running(commands):
+        sys.exit(0)
+    if not instance.listen() and instance.send_to_running(commands):
+        # Un'altra istanza si è avviata nel frattempo
+        sys.exit(0)
+    
+    profiler.begin("first paint")
     window = MainWindow()
+    instance.commands_received.connect(window.handle_instance_commands)
     
     # Se l'app è avviata con --minimized, nascondi la finestra principale
     if args.minimized:
         window.hide()
+        profiler.discard("first paint")
     
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    instance.close()
+    sys.exit(exit_code)
@@ -0,0 +1,143 @@
+"""
+Glik - A Nightscout desktop viewer
+Copyright (C) 2025 Emmanuele Pani
+
+Finestra del profilo glicemico ambulatoriale (AGP)
+"""
+
+from PyQt5.QtWidgets import (QDialog, QLabel, QVBoxLayout, QHBoxLayout, QComboBox,
+                             QPushButton, QFileDialog, QMessageBox)
+from PyQt5.QtGui import QPixmap
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from .resources import get_icon
+from .agp_report import AgpReportWorker
+from .history_store import source_id
+from .glucose_stats import DEFAULT_TARGET_LOW, DEFAULT_TARGET_HIGH
+
+
+class AgpDialog(QDialog):
+    """Mostra ed esporta il report AGP, generato in un thread separato"""
+
+    # Richieste al worker del report
+    generate_requested = pyqtSignal(int)
+    export_requested = pyqtSignal(str)
+
+    # Periodi selezionabili (giorni)
+    PERIODS = (14, 30, 60, 90)
+
+    def __init__(self, history_store, config, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Profilo glicemico (AGP)")
+        self.setWindowIcon(get_icon())
+        self.setModal(True)
+        self.setStyleSheet("""
+            QDialog {
+                background-color: #1e1e1e;
+                color: white;
+            }
+            QLabel {
+                color: white;
+            }
+            QComboBox {
+                background-color: #2d2d2d;
+                color: white;
+                border: 1px solid #3d3d3d;
+                padding: 5px;
+                border-radius: 3px;
+            }
+            QPushButton {
+                background-color: #2d2d2d;
+                color: white;
+                border: 1px solid #3d3d3d;
+                padding: 5px 15px;
+                border-radius: 3px;
+            }
+            QPushButton:hover {
+                background-color: #3d3d3d;
+            }
+            QPushButton:disabled {
+                color: #777777;
+            }
+        """)
+
+        layout = QVBoxLayout(self)
+
+        # Selezione del periodo ed esportazione
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("Periodo:"))
+        self.period = QComboBox()
+        self.period.addItems([f"{days} giorni" for days in self.PERIODS])
+        self.period.currentIndexChanged.connect(self.request_report)
+        controls.addWidget(self.period)
+        controls.addStretch()
+        self.export_button = QPushButton("Esporta...")
+        self.export_button.setToolTip("Salva il report come PDF o immagine PNG")
+        self.export_button.setEnabled(False)
+        self.export_button.clicked.connect(self.export_report)
+        controls.addWidget(self.export_button)
+        layout.addLayout(controls)
+
+        # Report
+        self.report_label = QLabel("Generazione del report...")
+        self.report_label.setAlignment(Qt.AlignCenter)
+        self.report_label.setMinimumSize(1100, 760)
+        layout.addWidget(self.report_label)
+
+        # Worker per il calcolo e il disegno fuori dal thread della GUI
+        self.report_thread = QThread(self)
+        self.worker = AgpReportWorker(
+            history_store,
+            source_id(config),
+            config.get("target_low", DEFAULT_TARGET_LOW),
+            config.get("target_high", DEFAULT_TARGET_HIGH)
+        )
+        self.worker.moveToThread(self.report_thread)
+        self.generate_requested.connect(self.worker.generate)
+        self.export_requested.connect(self.worker.export)
+        self.worker.report_ready.connect(self.on_report_ready)
+        self.worker.report_failed.connect(self.on_report_failed)
+        self.worker.export_finished.connect(self.on_export_finished)
+        self.report_thread.finished.connect(self.worker.deleteLater)
+        self.report_thread.start()
+
+        self.request_report()
+
+    def request_report(self):
+        """Richiede il report per il periodo selezionato"""
+        self.export_button.setEnabled(False)
+        self.report_label.setText("Generazione del report...")
+        self.generate_requested.emit(self.PERIODS[self.period.currentIndex()])
+
+    def on_report_ready(self, image):
+        """Mostra il report generato"""
+        self.report_label.setPixmap(QPixmap.fromImage(image))
+        self.export_button.setEnabled(True)
+
+    def on_report_failed(self, message):
+        """Mostra il motivo per cui il report non è disponibile"""
+        self.report_label.setText(message)
+
+    def export_report(self):
+        """Chiede dove salvare il report e ne avvia l'esportazione"""
+        days = self.PERIODS[self.period.currentIndex()]
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Esporta report AGP", f"Glik_AGP_{days}_giorni.pdf",
+            "PDF (*.pdf);;Immagine PNG (*.png)"
+        )
+        if path:
+            self.export_button.setEnabled(False)
+            self.export_requested.emit(path)
+
+    def on_export_finished(self, success, message):
+        """Segnala l'esito dell'esportazione"""
+        self.export_button.setEnabled(True)
+        if success:
+            QMessageBox.information(self, "Report AGP", f"Report salvato in:\n{message}")
+        else:
+            QMessageBox.warning(self, "Report AGP", message)
+
+    def done(self, result):
+        """Ferma il worker prima di chiudere la finestra"""
+        self.report_thread.quit()
+        self.report_thread.wait()
+        super().done(result)
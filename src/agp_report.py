@@ -0,0 +1,305 @@
+"""
+Glik - A Nightscout desktop viewer
+Copyright (C) 2025 Emmanuele Pani
+
+Profilo glicemico ambulatoriale (AGP): calcolo, disegno ed esportazione
+"""
+
+import time
+import warnings
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+import numpy as np
+from PyQt5.QtCore import QObject, QRectF, QPointF, Qt, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import (QImage, QPainter, QPainterPath, QColor, QPen, QFont,
+                         QPdfWriter, QPageLayout, QPageSize)
+
+from .glucose_stats import compute_stats, VERY_LOW, VERY_HIGH
+
+# Percentili mostrati nel profilo
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Ampiezza (minuti) delle fasce orarie su cui calcolare i percentili
+BIN_MINUTES = 15
+
+# Letture minime perché una fascia oraria sia considerata attendibile
+MIN_BIN_SAMPLES = 5
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def minute_of_day(timestamps: np.ndarray) -> np.ndarray:
+    """
+    Converte gli istanti (secondi epoch) nel minuto del giorno in ora locale
+
+    Lo scostamento dal tempo UTC viene calcolato una volta per giorno,
+    così il cambio dell'ora legale è rispettato senza cicli per lettura.
+    """
+    days = np.floor(timestamps / 86400).astype(np.int64)
+    unique_days, inverse = np.unique(days, return_inverse=True)
+    offsets = np.array([time.localtime(int(day) * 86400 + 43200).tm_gmtoff for day in unique_days],
+                       dtype=np.float64)
+    local = timestamps + offsets[inverse]
+    return (local % 86400) / 60
+
+
+def compute_agp(timestamps: np.ndarray, values: np.ndarray,
+                bin_minutes: int = BIN_MINUTES) -> Optional[Dict[str, Any]]:
+    """
+    Calcola i percentili per fascia oraria in un unico passaggio vettoriale
+
+    Le letture vengono ordinate per fascia e disposte in una matrice
+    (fasce x letture, completata con NaN) su cui i percentili sono
+    calcolati lungo le righe. Le fasce con poche letture vengono
+    interpolate da quelle vicine.
+
+    Args:
+        timestamps: Istanti delle letture (secondi epoch)
+        values: Valori glicemici (mg/dL)
+        bin_minutes: Ampiezza delle fasce orarie (minuti)
+
+    Returns:
+        Dizionario con il centro di ogni fascia ('minutes', minuti dalla
+        mezzanotte), i percentili ('percentiles', percentile -> array) e
+        il numero di letture per fascia ('counts'); None se non ci sono dati
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return None
+
+    nbins = MINUTES_PER_DAY // bin_minutes
+    bins = np.minimum((minute_of_day(np.asarray(timestamps, dtype=np.float64)) // bin_minutes).astype(np.intp),
+                      nbins - 1)
+
+    # Posizione di ogni lettura all'interno della propria fascia
+    order = np.argsort(bins, kind="stable")
+    sorted_bins = bins[order]
+    counts = np.bincount(bins, minlength=nbins)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    positions = np.arange(len(values)) - starts[sorted_bins]
+
+    grid = np.full((nbins, counts.max()), np.nan)
+    grid[sorted_bins, positions] = values[order]
+
+    with warnings.catch_warnings():
+        # Le fasce vuote producono NaN, gestiti sotto
+        warnings.simplefilter("ignore", RuntimeWarning)
+        result = np.nanpercentile(grid, PERCENTILES, axis=1)
+
+    valid = counts >= MIN_BIN_SAMPLES
+    if not valid.any():
+        return None
+
+    minutes = (np.arange(nbins) + 0.5) * bin_minutes
+    if not valid.all():
+        # Interpolazione circolare: la mezzanotte unisce la fine e l'inizio del giorno
+        for row in result:
+            row[~valid] = np.interp(minutes[~valid], minutes[valid], row[valid], period=MINUTES_PER_DAY)
+
+    return {
+        "minutes": minutes,
+        "percentiles": dict(zip(PERCENTILES, result)),
+        "counts": counts,
+    }
+
+
+def render_agp(agp: Dict[str, Any], stats: Dict[str, Any], days: int,
+               start: float, end: float, target_low: float, target_high: float,
+               width: int = 1100, height: int = 760) -> QImage:
+    """
+    Disegna il report AGP su una QImage (utilizzabile fuori dal thread della GUI)
+
+    Args:
+        agp: Risultato di compute_agp
+        stats: Risultato di compute_stats
+        days: Giorni inclusi nel report
+        start: Istante della prima lettura (secondi epoch)
+        end: Istante dell'ultima lettura (secondi epoch)
+        target_low: Limite inferiore dell'intervallo obiettivo (mg/dL)
+        target_high: Limite superiore dell'intervallo obiettivo (mg/dL)
+    """
+    image = QImage(width, height, QImage.Format_ARGB32_Premultiplied)
+    image.fill(QColor(255, 255, 255))
+
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.Antialiasing)
+
+    # Intestazione
+    painter.setPen(QColor(30, 30, 30))
+    painter.setFont(QFont("Arial", 18, QFont.Bold))
+    painter.drawText(QRectF(40, 20, width - 80, 32), Qt.AlignLeft | Qt.AlignVCenter,
+                     "Profilo glicemico ambulatoriale (AGP)")
+
+    period = (f"{datetime.fromtimestamp(start).strftime('%d/%m/%Y')} - "
+              f"{datetime.fromtimestamp(end).strftime('%d/%m/%Y')}")
+    painter.setFont(QFont("Arial", 10))
+    painter.drawText(QRectF(40, 54, width - 80, 20), Qt.AlignLeft | Qt.AlignVCenter,
+                     f"Ultimi {days} giorni ({period}) · {stats['count']} letture · "
+                     f"sensore attivo {stats['coverage']:.0f}%")
+
+    # Metriche riassuntive
+    metrics = [
+        ("In range", f"{stats['time_in_range']:.0f}%", f"{target_low:.0f}-{target_high:.0f} mg/dL"),
+        ("Sotto", f"{stats['time_below_range']:.0f}%", f"<{VERY_LOW}: {stats['time_very_low']:.1f}%"),
+        ("Sopra", f"{stats['time_above_range']:.0f}%", f">{VERY_HIGH}: {stats['time_very_high']:.1f}%"),
+        ("Media", f"{stats['mean']:.0f}", "mg/dL"),
+        ("GMI", f"{stats['gmi']:.1f}%", "HbA1c stimata"),
+        ("CV", f"{stats['cv']:.0f}%", f"DS {stats['sd']:.0f} mg/dL"),
+        ("Episodi", f"{stats['low_events']} / {stats['high_events']}", "ipo / iper"),
+    ]
+    box_width = (width - 80) / len(metrics)
+    for index, (title, value, detail) in enumerate(metrics):
+        x = 40 + index * box_width
+        painter.setPen(QColor(110, 110, 110))
+        painter.setFont(QFont("Arial", 9))
+        painter.drawText(QRectF(x, 86, box_width, 18), Qt.AlignCenter, title)
+        painter.setPen(QColor(30, 30, 30))
+        painter.setFont(QFont("Arial", 16, QFont.Bold))
+        painter.drawText(QRectF(x, 104, box_width, 28), Qt.AlignCenter, value)
+        painter.setPen(QColor(110, 110, 110))
+        painter.setFont(QFont("Arial", 8))
+        painter.drawText(QRectF(x, 132, box_width, 16), Qt.AlignCenter, detail)
+
+    # Area del grafico
+    chart = QRectF(80, 180, width - 120, height - 240)
+    y_min, y_max = 40.0, 400.0
+
+    def to_x(minute):
+        return chart.left() + minute / MINUTES_PER_DAY * chart.width()
+
+    def to_y(value):
+        value = min(max(value, y_min), y_max)
+        return chart.bottom() - (value - y_min) / (y_max - y_min) * chart.height()
+
+    # Intervallo obiettivo
+    painter.fillRect(QRectF(chart.left(), to_y(target_high), chart.width(), to_y(target_low) - to_y(target_high)),
+                     QColor(68, 200, 68, 40))
+
+    # Griglia e assi
+    painter.setFont(QFont("Arial", 9))
+    for level in (VERY_LOW, target_low, target_high, VERY_HIGH, 350):
+        y = to_y(level)
+        painter.setPen(QPen(QColor(200, 200, 200), 1, Qt.DashLine))
+        painter.drawLine(QPointF(chart.left(), y), QPointF(chart.right(), y))
+        painter.setPen(QColor(90, 90, 90))
+        painter.drawText(QRectF(chart.left() - 60, y - 9, 52, 18), Qt.AlignRight | Qt.AlignVCenter, f"{level:.0f}")
+    for hour in range(0, 25, 3):
+        x = to_x(hour * 60)
+        painter.setPen(QPen(QColor(220, 220, 220), 1))
+        painter.drawLine(QPointF(x, chart.top()), QPointF(x, chart.bottom()))
+        painter.setPen(QColor(90, 90, 90))
+        painter.drawText(QRectF(x - 30, chart.bottom() + 6, 60, 18), Qt.AlignCenter, f"{hour % 24:02d}:00")
+    painter.setPen(QPen(QColor(120, 120, 120), 1))
+    painter.drawRect(chart)
+
+    # Le curve partono e terminano alla mezzanotte, chiudendo il giro del giorno
+    minutes = np.concatenate(([0.0], agp["minutes"], [float(MINUTES_PER_DAY)]))
+
+    def curve(percentile):
+        row = agp["percentiles"][percentile]
+        edge = (row[0] + row[-1]) / 2
+        return np.concatenate(([edge], row, [edge]))
+
+    def band(lower, upper, color):
+        low, high = curve(lower), curve(upper)
+        path = QPainterPath(QPointF(to_x(minutes[0]), to_y(high[0])))
+        for minute, value in zip(minutes[1:], high[1:]):
+            path.lineTo(to_x(minute), to_y(value))
+        for minute, value in zip(minutes[::-1], low[::-1]):
+            path.lineTo(to_x(minute), to_y(value))
+        path.closeSubpath()
+        painter.fillPath(path, color)
+
+    band(5, 95, QColor(70, 130, 200, 60))
+    band(25, 75, QColor(70, 130, 200, 130))
+
+    median = curve(50)
+    path = QPainterPath(QPointF(to_x(minutes[0]), to_y(median[0])))
+    for minute, value in zip(minutes[1:], median[1:]):
+        path.lineTo(to_x(minute), to_y(value))
+    painter.setPen(QPen(QColor(20, 60, 140), 3))
+    painter.drawPath(path)
+
+    # Legenda
+    painter.setFont(QFont("Arial", 9))
+    legend = [
+        (QColor(20, 60, 140), "Mediana"),
+        (QColor(70, 130, 200, 130), "25-75° percentile"),
+        (QColor(70, 130, 200, 60), "5-95° percentile"),
+        (QColor(68, 200, 68, 80), "Intervallo obiettivo"),
+    ]
+    x = chart.left()
+    for color, label in legend:
+        painter.fillRect(QRectF(x, height - 30, 14, 14), color)
+        painter.setPen(QColor(60, 60, 60))
+        painter.drawText(QRectF(x + 20, height - 32, 160, 18), Qt.AlignLeft | Qt.AlignVCenter, label)
+        x += 180
+
+    painter.end()
+    return image
+
+
+class AgpReportWorker(QObject):
+    """Calcola, disegna ed esporta il report AGP in un QThread dedicato"""
+
+    # Emesso con l'immagine del report
+    report_ready = pyqtSignal(QImage)
+    # Emesso con il messaggio da mostrare se il report non è disponibile
+    report_failed = pyqtSignal(str)
+    # Emesso al termine dell'esportazione (esito, messaggio)
+    export_finished = pyqtSignal(bool, str)
+
+    def __init__(self, history_store, source: str, target_low: float, target_high: float):
+        super().__init__()
+        self.history_store = history_store
+        self.source = source
+        self.target_low = target_low
+        self.target_high = target_high
+        self.image = None
+
+    @pyqtSlot(int)
+    def generate(self, days):
+        """Genera il report sugli ultimi 'days' giorni della cronologia"""
+        try:
+            start = int((time.time() - days * 24 * 60 * 60) * 1000)
+            timestamps, values = self.history_store.get_arrays(self.source, start)
+            stats = compute_stats(timestamps, values, self.target_low, self.target_high)
+            agp = compute_agp(timestamps, values)
+            if not stats or not agp:
+                self.image = None
+                self.report_failed.emit("Letture insufficienti nel periodo selezionato")
+                return
+
+            self.image = render_agp(agp, stats, days, timestamps[0], timestamps[-1],
+                                    self.target_low, self.target_high)
+            self.report_ready.emit(self.image)
+        except Exception as e:
+            self.image = None
+            self.report_failed.emit(f"Errore nella generazione del report: {str(e)}")
+
+    @pyqtSlot(str)
+    def export(self, path):
+        """Esporta l'ultimo report come PDF (estensione .pdf) o immagine"""
+        if self.image is None:
+            self.export_finished.emit(False, "Nessun report da esportare")
+            return
+        try:
+            if path.lower().endswith(".pdf"):
+                writer = QPdfWriter(path)
+                writer.setPageSize(QPageSize(QPageSize.A4))
+                writer.setPageOrientation(QPageLayout.Landscape)
+                writer.setTitle("Glik - Profilo glicemico ambulatoriale")
+
+                painter = QPainter(writer)
+                page = QRectF(painter.viewport())
+                scale = min(page.width() / self.image.width(), page.height() / self.image.height())
+                target = QRectF(0, 0, self.image.width() * scale, self.image.height() * scale)
+                painter.drawImage(target, self.image)
+                painter.end()
+            elif not self.image.save(path):
+                self.export_finished.emit(False, f"Impossibile salvare {path}")
+                return
+            self.export_finished.emit(True, path)
+        except Exception as e:
+            self.export_finished.emit(False, f"Errore nell'esportazione: {str(e)}")
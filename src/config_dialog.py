@@ -19,8 +19,7 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 from PyQt5.QtWidgets import (QDialog, QLineEdit, QPushButton, QFormLayout, 
                             QHBoxLayout, QTabWidget, QWidget, QSpinBox, QLabel,
                             QCheckBox, QComboBox)
-from PyQt5.QtGui import QIcon
-from .resources import get_icon_path
+from .resources import get_icon
 import winreg
 import os
 import sys
@@ -29,7 +28,7 @@ class ConfigDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Configurazione Glik")
-        self.setWindowIcon(QIcon(get_icon_path()))
+        self.setWindowIcon(get_icon())
         self.setModal(True)
         self.setStyleSheet("""
             QDialog {
@@ -89,12 +88,16 @@ class ConfigDialog(QDialog):
         self.url_input = QLineEdit()
         self.token_input = QLineEdit()
         self.sha1_input = QLineEdit()
+        self.realtime_stream = QCheckBox("Aggiornamenti in tempo reale (websocket)")
+        self.realtime_stream.setToolTip("Riceve le nuove letture appena caricate su Nightscout; "
+                                        "se il canale si interrompe si torna al polling")
         
         self.nightscout_group = QWidget()
         nightscout_layout = QFormLayout()
         nightscout_layout.addRow("URL Nightscout:", self.url_input)
         nightscout_layout.addRow("API Secret Token:", self.token_input)
         nightscout_layout.addRow("API Secret SHA1:", self.sha1_input)
+        nightscout_layout.addRow(self.realtime_stream)
         self.nightscout_group.setLayout(nightscout_layout)
         
         # Dexcom fields
@@ -131,9 +134,9 @@ class ConfigDialog(QDialog):
         self.refresh_interval.setMinimum(10)  # Minimo 10 secondi
         self.refresh_interval.setMaximum(300)  # Massimo 5 minuti
         self.refresh_interval.setSuffix(" secondi")
-        self.refresh_interval.setToolTip("Intervallo di aggiornamento (10-300 secondi)")
+        self.refresh_interval.setToolTip("Intervallo di aggiornamento quando non è possibile prevedere la prossima lettura (10-300 secondi)")
         
-        refresh_note = QLabel("Nota: Un intervallo troppo breve potrebbe causare problemi di performance")
+        refresh_note = QLabel("Nota: I dati vengono richiesti quando è prevista una nuova lettura del sensore (ogni 5 minuti)")
         refresh_note.setStyleSheet("color: #888888; font-size: 10px;")
         
         settings_layout.addRow("Intervallo di refresh:", self.refresh_interval)
@@ -149,6 +152,26 @@ class ConfigDialog(QDialog):
         settings_layout.addRow(self.autostart)
         settings_layout.addRow(self.minimize_to_tray)
         
+        # Statistiche sulla cronologia
+        self.target_low = QSpinBox()
+        self.target_low.setRange(50, 120)
+        self.target_low.setSuffix(" mg/dL")
+        self.target_low.setToolTip("Limite inferiore dell'intervallo obiettivo (tempo in range)")
+        
+        self.target_high = QSpinBox()
+        self.target_high.setRange(120, 300)
+        self.target_high.setSuffix(" mg/dL")
+        self.target_high.setToolTip("Limite superiore dell'intervallo obiettivo (tempo in range)")
+        
+        self.stats_days = QSpinBox()
+        self.stats_days.setRange(1, 90)
+        self.stats_days.setSuffix(" giorni")
+        self.stats_days.setToolTip("Periodo su cui calcolare le statistiche mostrate nella finestra principale")
+        
+        settings_layout.addRow("Obiettivo minimo:", self.target_low)
+        settings_layout.addRow("Obiettivo massimo:", self.target_high)
+        settings_layout.addRow("Periodo statistiche:", self.stats_days)
+        
         settings_tab.setLayout(settings_layout)
         
         # Aggiungi tabs
@@ -180,7 +203,10 @@ class ConfigDialog(QDialog):
             "connection_type": connection_type,
             "refresh_interval": self.refresh_interval.value(),
             "minimize_to_tray": self.minimize_to_tray.isChecked(),
-            "autostart": self.autostart.isChecked()
+            "autostart": self.autostart.isChecked(),
+            "target_low": self.target_low.value(),
+            "target_high": self.target_high.value(),
+            "stats_days": self.stats_days.value()
         }
         
         if connection_type == "Nightscout":
@@ -188,6 +214,7 @@ class ConfigDialog(QDialog):
                 "nightscout_url": self.url_input.text().strip(),
                 "api_secret": self.token_input.text().strip(),
                 "api_secret_sha1": self.sha1_input.text().strip(),
+                "realtime_stream": self.realtime_stream.isChecked(),
             })
         else:  # Dexcom Share
             config.update({
@@ -210,6 +237,7 @@ class ConfigDialog(QDialog):
         self.url_input.setText(config.get("nightscout_url", ""))
         self.token_input.setText(config.get("api_secret", ""))
         self.sha1_input.setText(config.get("api_secret_sha1", ""))
+        self.realtime_stream.setChecked(config.get("realtime_stream", False))
         
         # Imposta i campi Dexcom
         self.dexcom_username.setText(config.get("dexcom_username", ""))
@@ -227,6 +255,9 @@ class ConfigDialog(QDialog):
         self.refresh_interval.setValue(config.get("refresh_interval", 30))
         self.minimize_to_tray.setChecked(config.get("minimize_to_tray", True))
         self.autostart.setChecked(config.get("autostart", False))
+        self.target_low.setValue(config.get("target_low", 70))
+        self.target_high.setValue(config.get("target_high", 180))
+        self.stats_days.setValue(config.get("stats_days", 14))
         
         # Aggiorna la visibilità dei gruppi
         self.on_connection_type_changed(connection_type)
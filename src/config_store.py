@@ -0,0 +1,208 @@
+"""
+Glik - A Nightscout desktop viewer
+Copyright (C) 2025 Emmanuele Pani
+
+Archivio centralizzato della configurazione cifrata
+"""
+
+import os
+import json
+import tempfile
+from typing import Optional, Dict, Any, Iterable, Tuple
+
+from PyQt5.QtCore import QObject, QTimer, QFileSystemWatcher, pyqtSignal
+from .crypto import get_crypto
+from .resources import get_app_data_dir
+
+# Configurazione usata al primo avvio
+DEFAULT_CONFIG = {
+    "connection_type": "Nightscout",
+    "nightscout_url": "",
+    "api_secret": "",
+    "api_secret_sha1": "",
+    "dexcom_username": "",
+    "dexcom_password": "",
+    "dexcom_region": "ous",
+    "dark_mode": True,
+    "minimize_to_tray": True,
+    "refresh_interval": 30,
+    "autostart": False
+}
+
+
+class ConfigStore(QObject):
+    """
+    Configurazione dell'applicazione, letta e decifrata una sola volta
+
+    La copia in memoria è l'unico riferimento per il resto del programma.
+    I salvataggi vengono raggruppati (debounce) e scritti in modo atomico:
+    file temporaneo, fsync e sostituzione, così un'interruzione non lascia
+    mai un config.json troncato. Le modifiche fatte da altri processi
+    vengono rilevate osservando il solo config.json (non la directory,
+    che contiene anche cronologia e sessione Dexcom) e confrontandone la
+    data di modifica.
+    """
+
+    # Emesso con la nuova configurazione quando il file cambia dall'esterno
+    changed = pyqtSignal(dict)
+
+    # Attesa (ms) prima di scrivere, per raggruppare salvataggi ravvicinati
+    SAVE_DELAY = 500
+
+    def __init__(self, path: Optional[str] = None, parent=None):
+        """
+        Args:
+            path: Percorso del file, di default config.json nella
+                directory dati dell'applicazione
+        """
+        super().__init__(parent)
+        self.path = path or os.path.join(get_app_data_dir(), "config.json")
+        self.config = {}
+        self._mtime = None
+        self._dirty = False
+
+        self._save_timer = QTimer(self)
+        self._save_timer.setSingleShot(True)
+        self._save_timer.timeout.connect(self._on_save_timeout)
+
+        # La sostituzione atomica del file interrompe l'osservazione:
+        # il percorso viene aggiunto di nuovo a ogni modifica (vedi _watch)
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._on_file_changed)
+
+    def load(self) -> bool:
+        """
+        Legge e decifra la configurazione dal disco
+
+        Returns:
+            True se è stata caricata una configurazione valida
+        """
+        config, encrypted = self._read(self.path)
+        if not config:
+            return False
+        self.config = config
+        self._mtime = self._file_mtime()
+        self._watch()
+        if not encrypted:
+            # Migra il file in chiaro delle versioni precedenti
+            self.save(immediate=True)
+        return True
+
+    def load_legacy(self, paths: Iterable[Optional[str]]) -> bool:
+        """
+        Importa la configurazione da un percorso legacy e la salva nella nuova posizione
+
+        Returns:
+            True se una configurazione è stata importata
+        """
+        for legacy_path in paths:
+            if not legacy_path or not os.path.exists(legacy_path):
+                continue
+            config, _ = self._read(legacy_path)
+            if config:
+                self.save(config, immediate=True)
+                print("Configurazione migrata con successo in APPDATA")
+                return True
+        return False
+
+    def _read(self, path: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Legge un file di configurazione, cifrato o in JSON semplice
+
+        Returns:
+            Configurazione (None se assente o non valida) e True se il file era cifrato
+        """
+        try:
+            if not os.path.exists(path):
+                return None, True
+            with open(path, "r") as f:
+                data = f.read()
+            if data.strip().startswith('{'):
+                # JSON non cifrato (versioni precedenti)
+                return json.loads(data), False
+            return get_crypto().decrypt_config(data), True
+        except Exception as e:
+            print(f"Errore nel caricare la configurazione da {path}: {e}")
+            return None, True
+
+    def save(self, config: Optional[Dict[str, Any]] = None, immediate: bool = False):
+        """
+        Aggiorna la configurazione e ne pianifica la scrittura
+
+        Args:
+            config: Nuova configurazione (di default quella in memoria)
+            immediate: Scrive subito invece di attendere altri salvataggi
+        """
+        if config is not None:
+            self.config = dict(config)
+        self._dirty = True
+        if immediate:
+            self.flush()
+        else:
+            self._save_timer.start(self.SAVE_DELAY)
+
+    def flush(self):
+        """Scrive su disco le modifiche in attesa"""
+        self._save_timer.stop()
+        if not self._dirty:
+            return
+
+        encrypted_config = get_crypto().encrypt_config(self.config)
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+
+        fd, temp_path = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(encrypted_config)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        self._dirty = False
+        self._mtime = self._file_mtime()
+        self._watch()
+
+    def _watch(self):
+        """Osserva config.json, se esiste e non è già osservato"""
+        if os.path.exists(self.path) and self.path not in self._watcher.files():
+            self._watcher.addPath(self.path)
+
+    def _file_mtime(self) -> Optional[int]:
+        """Data di modifica del file in nanosecondi, None se non esiste"""
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _on_file_changed(self, path):
+        """Ricarica la configurazione se il file è stato modificato da un altro processo"""
+        # Dopo una sostituzione il file osservato non esiste più
+        self._watch()
+        if self._dirty:
+            # Le modifiche in memoria non ancora scritte hanno la precedenza
+            return
+        mtime = self._file_mtime()
+        if mtime is None or mtime == self._mtime:
+            return
+        if self.load():
+            self.changed.emit(dict(self.config))
+
+    def _on_save_timeout(self):
+        """Scrive i salvataggi raggruppati allo scadere dell'attesa"""
+        try:
+            self.flush()
+        except Exception as e:
+            # Nessun chiamante a cui propagare l'errore: lo si segnala soltanto
+            print(f"Errore nel salvare la configurazione: {e}")
+
+    def close(self):
+        """Scrive le modifiche in attesa, segnalando gli errori senza sollevarli"""
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Errore nel salvare la configurazione: {e}")
@@ -8,6 +8,7 @@ import base64
 import os
 import sys
 import json
+import threading
 from pathlib import Path
 
 class ConfigCrypto:
@@ -83,4 +84,17 @@ class ConfigCrypto:
         except Exception as e:
             if __debug__:
                 print(f"Errore migrazione: {e}")
-            return False 
\ No newline at end of file
+            return False
+
+
+_shared_crypto = None
+_shared_crypto_lock = threading.Lock()
+
+
+def get_crypto():
+    """Restituisce il cifratore condiviso, leggendo la chiave una sola volta"""
+    global _shared_crypto
+    with _shared_crypto_lock:
+        if _shared_crypto is None:
+            _shared_crypto = ConfigCrypto()
+        return _shared_crypto
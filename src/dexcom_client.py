@@ -7,16 +7,63 @@ Client per la connessione a Dexcom Share API
 
 import sys
 import os
+import time
 from datetime import datetime
 from typing import Optional, Dict, Any
 
+from .resources import get_app_data_dir
+
 try:
     from pydexcom import Dexcom, Region
+    from pydexcom.errors import AccountError, SessionError
     PYDEXCOM_AVAILABLE = True
 except ImportError:
     PYDEXCOM_AVAILABLE = False
     print("pydexcom non disponibile. Installa con: pip install pydexcom")
 
+# Durata (secondi) oltre la quale una sessione salvata non viene riusata
+SESSION_TTL = 12 * 60 * 60
+
+# Limiti di Dexcom Share: finestra massima di 24 ore e 288 letture
+MAX_MINUTES = 1440
+MAX_COUNT = 288
+
+
+def is_available() -> bool:
+    """Verifica se pydexcom è disponibile, senza creare un client"""
+    return PYDEXCOM_AVAILABLE
+
+
+if PYDEXCOM_AVAILABLE:
+    class _ResumableDexcom(Dexcom):
+        """Dexcom che riprende una sessione salvata invece di rifare il login"""
+
+        def __init__(self, *, saved_session=None, on_session=None, **kwargs):
+            self._saved_session = saved_session
+            self._on_session = on_session
+            self._session_hook_called = False
+            super().__init__(**kwargs)
+            if not self._session_hook_called:
+                # _get_session è un metodo privato di pydexcom (>=0.5): se una
+                # versione diversa non lo usa, la sessione non viene né ripresa né salvata
+                print("Versione di pydexcom non supportata: la sessione Dexcom non verrà "
+                      "riusata (richiesto pydexcom>=0.5,<0.6)")
+
+        def _get_session(self):
+            # Al primo utilizzo prova la sessione salvata; se è scaduta
+            # pydexcom riceve un SessionError e richiama questo metodo
+            self._session_hook_called = True
+            saved_session = self._saved_session
+            self._saved_session = None
+            if saved_session:
+                self._account_id = saved_session["account_id"]
+                self._session_id = saved_session["session_id"]
+                return
+
+            super()._get_session()
+            if self._on_session:
+                self._on_session(self._account_id, self._session_id)
+
 class DexcomClient:
     """Client per la connessione a Dexcom Share API"""
     
@@ -35,12 +82,17 @@ class DexcomClient:
         self.dexcom = None
         self.connected = False
         self.last_error = None
+        self._crypto = None
         
+        # La connessione avviene alla prima richiesta di dati, così creare
+        # il client non blocca il thread chiamante sui server di Dexcom
         if not PYDEXCOM_AVAILABLE:
             self.last_error = "pydexcom non disponibile"
-            return
-            
-        self._connect()
+    
+    @property
+    def session_path(self) -> str:
+        """Percorso del file della sessione salvata"""
+        return os.path.join(get_app_data_dir(), "dexcom_session.json")
     
     def _connect(self):
         """Tenta la connessione a Dexcom"""
@@ -114,18 +166,17 @@ class DexcomClient:
             
             print(f"Tentativo di connessione a Dexcom con regione: {self.region.upper()}")
             
-            # Crea la connessione
-            self.dexcom = Dexcom(
+            # Crea la connessione, riprendendo la sessione salvata se valida.
+            # Non serve una lettura di prova: la prima richiesta di dati
+            # verifica la sessione e, se scaduta, rifà il login una sola volta
+            self.dexcom = _ResumableDexcom(
                 username=self.username,
                 password=self.password,
-                region=region_enum
+                region=region_enum,
+                saved_session=self._load_session(),
+                on_session=self._save_session
             )
             
-            # Testa la connessione
-            print("Test connessione Dexcom...")
-            reading = self.dexcom.get_current_glucose_reading()
-            print(f"Connessione riuscita! Lettura: {reading.value} mg/dL")
-            
             self.connected = True
             self.last_error = None
             return True
@@ -144,6 +195,8 @@ class DexcomClient:
             else:
                 self.last_error = f"Errore Dexcom: {error_msg}"
             
+            if self._is_auth_error(e):
+                self._clear_session()
             self.connected = False
             return False
     
@@ -177,7 +230,6 @@ class DexcomClient:
                 "trend_arrow": reading.trend_arrow,  # Freccia trend
                 "trend_description": reading.trend_description,  # Descrizione trend
                 "dateString": reading.datetime.isoformat(),  # Timestamp
-                "delta": 0,  # Dexcom non fornisce delta, calcoleremo
                 "mmol_l": reading.mmol_l  # Valore in mmol/L
             }
             
@@ -197,31 +249,34 @@ class DexcomClient:
             else:
                 self.last_error = f"Errore nel recuperare dati: {error_msg}"
             
-            self.connected = False
+            # Rifai il login solo se sessione o credenziali non sono più valide;
+            # un errore di rete non invalida la sessione
+            if self._is_auth_error(e):
+                self._invalidate_session()
             return None
     
-    def get_glucose_history(self, count: int = 2) -> Optional[list]:
+    def get_glucose_history(self, count: int = 2, minutes: int = MAX_MINUTES) -> Optional[list]:
         """
         Ottiene la cronologia delle letture glicemiche
         
         Args:
-            count: Numero di letture da recuperare
+            count: Numero di letture da recuperare (1-288)
+            minutes: Finestra in minuti in cui cercare le letture (1-1440)
             
         Returns:
-            Lista di letture glicemiche o None se errore
+            Lista di letture glicemiche (più recente per prima) o None se errore
         """
         if not self.connected or not self.dexcom:
             if not self._connect():
                 return None
         
+        count = max(1, min(count, MAX_COUNT))
+        minutes = max(1, min(minutes, MAX_MINUTES))
+        
         try:
             print(f"Richiesta {count} letture glicemiche da Dexcom...")
-            # Ottieni tutte le letture disponibili e poi limita il numero
-            readings = self.dexcom.get_glucose_readings()
-            
-            # Limita il numero di letture se necessario
-            if readings and len(readings) > count:
-                readings = readings[:count]
+            # Il limite viene applicato dal server: si scaricano solo le letture richieste
+            readings = self.dexcom.get_glucose_readings(minutes=minutes, max_count=count)
             
             if not readings:
                 self.last_error = "Nessuna lettura glicemica disponibile da Dexcom"
@@ -239,14 +294,11 @@ class DexcomClient:
                     "trend_arrow": reading.trend_arrow,
                     "trend_description": reading.trend_description,
                     "dateString": reading.datetime.isoformat(),
-                    "delta": 0,
                     "mmol_l": reading.mmol_l
                 }
                 glucose_list.append(glucose_data)
             
-            # Calcola delta se abbiamo almeno 2 letture
-            if len(glucose_list) >= 2:
-                glucose_list[0]["delta"] = glucose_list[0]["sgv"] - glucose_list[1]["sgv"]
+            # Delta e pendenza vengono calcolati dal worker (RollingDelta)
             
             return glucose_list
             
@@ -264,12 +316,101 @@ class DexcomClient:
             else:
                 self.last_error = f"Errore nel recuperare dati: {error_msg}"
             
-            self.connected = False
+            # Rifai il login solo se sessione o credenziali non sono più valide;
+            # un errore di rete non invalida la sessione
+            if self._is_auth_error(e):
+                self._invalidate_session()
             return None
     
+    def get_glucose_history_bulk(self, since: Optional[int] = None) -> Optional[list]:
+        """
+        Ottiene in una sola richiesta tutte le letture per la sincronizzazione
+        della cronologia
+        
+        Dexcom Share conserva al massimo 24 ore (288 letture), che rientrano
+        in un'unica risposta: la finestra viene ridotta al periodo successivo
+        all'ultima lettura già salvata.
+        
+        Args:
+            since: Timestamp (ms epoch) dell'ultima lettura salvata, None per
+                scaricare l'intera finestra di 24 ore
+            
+        Returns:
+            Lista di letture glicemiche (più recente per prima) o None se errore
+        """
+        minutes = MAX_MINUTES
+        if since is not None:
+            minutes = int((time.time() * 1000 - since) // 60000) + 1
+        # Al più una lettura ogni 5 minuti, più un margine per l'ultima
+        count = minutes // 5 + 2
+        return self.get_glucose_history(count=count, minutes=minutes)
+    
+    def _is_auth_error(self, error: Exception) -> bool:
+        """
+        Verifica se l'errore richiede un nuovo login
+
+        Si decide solo dal tipo di eccezione: il testo degli errori di rete
+        contiene l'URL delle letture (con "sessionId") e non va considerato.
+        """
+        return isinstance(error, (AccountError, SessionError))
+    
+    def _invalidate_session(self):
+        """Scarta la sessione corrente: il prossimo accesso rifarà il login"""
+        self.dexcom = None
+        self.connected = False
+        self._clear_session()
+    
+    def _get_crypto(self):
+        """Restituisce il cifratore usato per la sessione salvata"""
+        if self._crypto is None:
+            from .crypto import get_crypto
+            self._crypto = get_crypto()
+        return self._crypto
+    
+    def _load_session(self) -> Optional[Dict[str, Any]]:
+        """Carica la sessione salvata se appartiene all'account corrente e non è scaduta"""
+        try:
+            if not os.path.exists(self.session_path):
+                return None
+            with open(self.session_path, "r") as f:
+                session = self._get_crypto().decrypt_config(f.read())
+            if (not session
+                    or session.get("username") != self.username.strip()
+                    or session.get("region") != self.region.lower()
+                    or session.get("expires", 0) < time.time()):
+                return None
+            print("Ripresa sessione Dexcom salvata")
+            return session
+        except Exception as e:
+            print(f"Errore nel caricare la sessione Dexcom: {e}")
+            return None
+    
+    def _save_session(self, account_id: str, session_id: str):
+        """Salva cifrata la sessione appena ottenuta con il login"""
+        try:
+            session = {
+                "username": self.username.strip(),
+                "region": self.region.lower(),
+                "account_id": account_id,
+                "session_id": session_id,
+                "expires": time.time() + SESSION_TTL
+            }
+            with open(self.session_path, "w") as f:
+                f.write(self._get_crypto().encrypt_config(session))
+        except Exception as e:
+            print(f"Errore nel salvare la sessione Dexcom: {e}")
+    
+    def _clear_session(self):
+        """Elimina la sessione salvata"""
+        try:
+            if os.path.exists(self.session_path):
+                os.remove(self.session_path)
+        except OSError as e:
+            print(f"Errore nell'eliminare la sessione Dexcom: {e}")
+    
     def is_available(self) -> bool:
         """Verifica se pydexcom è disponibile"""
-        return PYDEXCOM_AVAILABLE
+        return is_available()
     
     def get_status(self) -> Dict[str, Any]:
         """Restituisce lo stato della connessione"""
@@ -282,14 +423,17 @@ class DexcomClient:
         }
     
     def update_credentials(self, username: str, password: str, region: str):
-        """Aggiorna le credenziali e riconnette"""
+        """Aggiorna le credenziali; la riconnessione avviene alla prossima richiesta"""
         self.username = username
         self.password = password
         self.region = region
-        self._connect()
+        self.dexcom = None
+        self.connected = False
+        self.last_error = None
     
     def disconnect(self):
         """Disconnette dal servizio Dexcom"""
         self.dexcom = None
         self.connected = False
         self.last_error = None
+        self._clear_session()
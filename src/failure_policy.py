@@ -0,0 +1,107 @@
+"""
+Glik - A Nightscout desktop viewer
+Copyright (C) 2025 Emmanuele Pani
+
+Gestione degli errori delle sorgenti dati con backoff e circuit breaker
+"""
+
+import random
+from datetime import datetime
+
+
+class CircuitBreaker:
+    """
+    Politica di ripetizione per una sorgente dati
+
+    Ogni errore consecutivo raddoppia l'attesa prima del tentativo
+    successivo (con una variazione casuale per non sincronizzare più
+    istanze). Dopo troppi errori il circuito si apre e la sorgente non
+    viene più interrogata fino alla scadenza dell'attesa; a quel punto
+    una sola richiesta di prova (semi-aperto) decide se richiuderlo o
+    riaprirlo con un'attesa doppia.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, base_delay: float = 10,
+                 max_delay: float = 600, open_delay: float = 300, jitter: float = 0.2):
+        """
+        Args:
+            failure_threshold: Errori consecutivi dopo cui il circuito si apre
+            base_delay: Attesa (secondi) dopo il primo errore
+            max_delay: Attesa massima (secondi)
+            open_delay: Attesa (secondi) alla prima apertura del circuito
+            jitter: Variazione casuale relativa dell'attesa (0.2 = ±20%)
+        """
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.open_delay = open_delay
+        self.jitter = jitter
+        self.reset()
+
+    def reset(self):
+        """Riporta il circuito allo stato iniziale"""
+        self.state = self.CLOSED
+        self.failures = 0
+        self.open_count = 0
+        self.retry_at = 0.0
+
+    def _with_jitter(self, delay: float) -> float:
+        """Applica la variazione casuale all'attesa"""
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def record_success(self):
+        """Registra una richiesta riuscita e chiude il circuito"""
+        self.reset()
+
+    def record_failure(self, now: float):
+        """
+        Registra una richiesta fallita
+
+        Args:
+            now: Istante corrente in secondi epoch
+        """
+        self.failures += 1
+
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            # Apre (o riapre) il circuito con un'attesa che raddoppia
+            delay = min(self.open_delay * 2 ** self.open_count, self.max_delay)
+            self.open_count += 1
+            self.state = self.OPEN
+        else:
+            delay = min(self.base_delay * 2 ** (self.failures - 1), self.max_delay)
+
+        self.retry_at = now + self._with_jitter(delay)
+
+    def allow_request(self, now: float) -> bool:
+        """
+        Verifica se la sorgente può essere interrogata
+
+        Allo scadere dell'attesa un circuito aperto passa a semi-aperto e
+        lascia passare una sola richiesta di prova.
+        """
+        if self.state == self.OPEN:
+            if now < self.retry_at:
+                return False
+            self.state = self.HALF_OPEN
+        return True
+
+    def retry_delay(self, now: float) -> float:
+        """Secondi mancanti al prossimo tentativo consentito (0 se nessun errore)"""
+        if not self.failures:
+            return 0.0
+        return max(self.retry_at - now, 0.0)
+
+    def describe(self) -> str:
+        """Descrizione dello stato da mostrare all'utente"""
+        if self.state == self.CLOSED and not self.failures:
+            return ""
+        retry_time = datetime.fromtimestamp(self.retry_at).strftime("%H:%M:%S")
+        if self.state == self.OPEN:
+            return f"Sorgente non raggiungibile, prossimo tentativo alle {retry_time}"
+        if self.state == self.HALF_OPEN:
+            return "Verifica della sorgente in corso"
+        return f"Errore {self.failures}/{self.failure_threshold}, nuovo tentativo alle {retry_time}"
@@ -0,0 +1,236 @@
+"""
+Glik - A Nightscout desktop viewer
+Copyright (C) 2025 Emmanuele Pani
+
+Worker per il recupero dei dati glicemici fuori dal thread della GUI
+"""
+
+import time
+
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+from .readings import reading_timestamp, READING_INTERVAL
+from .history_store import source_id
+from .rolling_delta import RollingDelta
+
+
+class FetchWorker(QObject):
+    """Esegue le richieste di rete e il parsing in un QThread dedicato"""
+
+    # Emesso con la lettura più recente (dizionario in formato Nightscout)
+    data_ready = pyqtSignal(object)
+    # Emesso con il messaggio di errore da mostrare all'utente
+    fetch_failed = pyqtSignal(str)
+    # Emesso al termine di ogni richiesta, con o senza successo
+    fetch_finished = pyqtSignal()
+
+    def __init__(self, history_store=None):
+        """
+        Args:
+            history_store: Archivio locale in cui salvare le letture ricevute
+        """
+        super().__init__()
+        self.history_store = history_store
+        self.config = {}
+        # Sorgente con cui le letture vengono salvate e lette dall'archivio
+        self.source = source_id(self.config)
+        self.nightscout_client = None
+        self.dexcom_client = None
+        # Timestamp dell'ultima lettura inviata alla GUI
+        self.last_emitted_time = None
+        # Delta e pendenza calcolati sulle letture recenti di entrambe le sorgenti
+        self.rolling_delta = RollingDelta()
+
+    @pyqtSlot(dict)
+    def set_config(self, config):
+        """Aggiorna la configurazione usata dal worker"""
+        self.config = dict(config)
+        self.source = source_id(self.config)
+
+        # La sessione Nightscout viene riusata, cambiano solo URL e headers
+        url = self.config.get("nightscout_url", "")
+        api_secret_sha1 = self.config.get("api_secret_sha1", "")
+        if self.nightscout_client:
+            self.nightscout_client.update_credentials(url, api_secret_sha1)
+        elif self.config.get("connection_type", "Nightscout") == "Nightscout":
+            # Importato solo quando serve: con Dexcom resta non caricato
+            from .nightscout_client import NightscoutClient
+            self.nightscout_client = NightscoutClient(url, api_secret_sha1)
+
+        # Il client Dexcom verrà ricreato alla prossima richiesta
+        self.dexcom_client = None
+        self.last_emitted_time = None
+        self.rolling_delta.reset()
+
+    @pyqtSlot()
+    def fetch(self):
+        """Recupera l'ultima lettura dalla sorgente configurata"""
+        try:
+            connection_type = self.config.get("connection_type", "Nightscout")
+
+            if connection_type == "Nightscout":
+                data = self._fetch_nightscout_data()
+            else:  # Dexcom Share
+                data = self._fetch_dexcom_data()
+
+            if data:
+                self._store_readings(data)
+                self._emit_reading(data if isinstance(data, list) else [data])
+            elif data is None or not self._emit_stored_reading():
+                # Errore, oppure nessuna lettura disponibile da mostrare
+                if connection_type == "Dexcom Share" and self.dexcom_client:
+                    error_msg = self.dexcom_client.last_error or "Nessun dato disponibile da Dexcom"
+                elif connection_type == "Nightscout" and self.nightscout_client:
+                    error_msg = self.nightscout_client.last_error or "Nessun dato disponibile"
+                else:
+                    error_msg = "Nessun dato disponibile"
+                self.fetch_failed.emit(error_msg)
+
+        except Exception as e:
+            self.fetch_failed.emit(str(e))
+
+        finally:
+            self.fetch_finished.emit()
+
+    @pyqtSlot(list)
+    def ingest_entries(self, entries):
+        """Salva e mostra le letture ricevute dal canale in tempo reale"""
+        if not entries:
+            return
+        self._store_readings(entries)
+        timestamp = max((reading_timestamp(entry) or 0 for entry in entries), default=0)
+        if self.last_emitted_time is None or timestamp > self.last_emitted_time:
+            self._emit_reading(entries)
+
+    def _emit_reading(self, entries):
+        """
+        Invia alla GUI la lettura più recente del gruppo
+
+        Tutte le letture passano dalla finestra scorrevole, che aggiunge
+        alla più recente delta (riportato a 5 minuti), pendenza a 15
+        minuti e segnalazione dei buchi nei dati.
+        """
+        entries = sorted(entries, key=lambda entry: reading_timestamp(entry) or 0)
+        latest_time = reading_timestamp(entries[-1])
+
+        if self.rolling_delta.is_empty() and latest_time is not None:
+            self._prime_rolling_delta(latest_time)
+
+        for entry in entries:
+            timestamp = reading_timestamp(entry)
+            sgv = entry.get("sgv")
+            if timestamp is not None and isinstance(sgv, (int, float)):
+                self.rolling_delta.update(timestamp, sgv)
+
+        latest = dict(entries[-1])
+        latest.update(self.rolling_delta.result())
+        # Permette alla GUI di scartare le letture di una sorgente non più configurata
+        latest["source"] = self.source
+        self.last_emitted_time = latest_time
+        self.data_ready.emit(latest)
+
+    def _prime_rolling_delta(self, until):
+        """Riempie la finestra scorrevole con le letture salvate (es. dopo un riavvio)"""
+        if not self.history_store:
+            return
+        try:
+            start = int((until - RollingDelta.WINDOW - RollingDelta.JITTER) * 1000)
+            end = int(until * 1000) + 1
+            for entry in self.history_store.get_range(self.source, start, end):
+                self.rolling_delta.update(reading_timestamp(entry), entry["sgv"])
+        except Exception as e:
+            print(f"Errore nel leggere le letture recenti: {str(e)}")
+
+    def _emit_stored_reading(self):
+        """
+        Se la GUI non ha ancora una lettura (es. dopo un riavvio) invia
+        l'ultima salvata nell'archivio
+
+        Returns:
+            True se la GUI ha una lettura da mostrare
+        """
+        if self.last_emitted_time is not None:
+            return True
+        latest = self.history_store.latest(self.source) if self.history_store else None
+        if not latest:
+            return False
+        self._emit_reading([latest])
+        return True
+
+    def _store_readings(self, data):
+        """Salva le letture ricevute nell'archivio locale"""
+        if not self.history_store:
+            return
+        try:
+            readings = data if isinstance(data, list) else [data]
+            self.history_store.add_readings(readings, self.source)
+        except Exception as e:
+            print(f"Errore nel salvare la cronologia: {str(e)}")
+
+    def _fetch_nightscout_data(self):
+        """Recupera i dati da Nightscout"""
+        if not self.nightscout_client:
+            return None
+
+        # Richiedi solo le letture successive all'ultima salvata
+        last_date = self.history_store.latest_date(self.source) if self.history_store else None
+        if last_date is None:
+            return self.nightscout_client.get_entries(count=1)
+        return self.nightscout_client.get_entries_since(last_date)
+
+    def _fetch_dexcom_data(self):
+        """Recupera i dati da Dexcom Share"""
+        try:
+            if not self.dexcom_client:
+                # Ricrea il client se necessario (pydexcom viene caricato qui)
+                from .dexcom_client import DexcomClient
+                self.dexcom_client = DexcomClient(
+                    username=self.config.get("dexcom_username", ""),
+                    password=self.config.get("dexcom_password", ""),
+                    region=self.config.get("dexcom_region", "ous")
+                )
+
+            # Verifica se il client è disponibile
+            if not self.dexcom_client.is_available():
+                print("pydexcom non disponibile. Installa con: pip install pydexcom")
+                return None
+
+            # Verifica se le credenziali sono impostate
+            if not self.dexcom_client.username or not self.dexcom_client.password:
+                print("Credenziali Dexcom non impostate")
+                return None
+
+            # Dopo un'interruzione recupera in un'unica richiesta le letture
+            # mancanti, altrimenti chiedi solo le ultime due
+            last_date = self.history_store.latest_date(self.source) if self.history_store else None
+            if last_date is None or time.time() * 1000 - last_date > 2 * READING_INTERVAL * 1000:
+                data = self.dexcom_client.get_glucose_history_bulk(since=last_date)
+            else:
+                data = self.dexcom_client.get_glucose_history(count=2)
+
+            if not data:
+                # Ottieni l'errore specifico dal client
+                error_msg = self.dexcom_client.last_error or "Errore sconosciuto"
+                print(f"Errore nel recuperare dati Dexcom: {error_msg}")
+                return None
+
+            return data
+
+        except Exception as e:
+            print(f"Errore Dexcom: {str(e)}")
+            return None
+
+    def abort(self):
+        """
+        Interrompe la richiesta Nightscout in corso
+
+        Chiamato dal thread della GUI all'uscita, mentre il worker può
+        essere bloccato in attesa della risposta.
+        """
+        client = self.nightscout_client
+        if client:
+            client.abort()
+
+    def shutdown(self):
+        """Chiude le connessioni aperte dopo l'arresto del thread"""
+        if self.nightscout_client:
+            self.nightscout_client.close()
@@ -0,0 +1,170 @@
+"""
+Glik - A Nightscout desktop viewer
+Copyright (C) 2025 Emmanuele Pani
+
+Previsione glicemica a breve termine con filtro di Kalman incrementale
+"""
+
+import json
+from typing import Optional, Dict, Any
+
+from .readings import READING_INTERVAL
+
+
+class GlucoseForecast:
+    """
+    Stima glicemia e velocità di variazione con un filtro di Kalman
+
+    Il modello è a velocità costante (stato: valore in mg/dL e variazione
+    in mg/dL al minuto) e viene aggiornato con ogni nuova lettura in tempo
+    costante, senza riconsiderare le letture precedenti. Lo stato è
+    serializzabile per sopravvivere ai riavvii.
+    """
+
+    # Prefisso della chiave con cui lo stato viene salvato nell'archivio locale
+    STATE_KEY = "glucose_forecast"
+    # Orizzonti di previsione (minuti)
+    HORIZONS = (15, 30, 60)
+    # Varianza del rumore del sensore ((mg/dL)^2)
+    MEASUREMENT_NOISE = 64.0
+    # Varianza dell'accelerazione ((mg/dL/min^2)^2): quanto può cambiare la tendenza
+    PROCESS_NOISE = 0.01
+    # Varianza iniziale della velocità di variazione ((mg/dL/min)^2)
+    INITIAL_RATE_VARIANCE = 1.0
+    # Oltre questa pausa (secondi) il filtro riparte da zero
+    MAX_GAP = 30 * 60
+    # Letture necessarie prima di pubblicare una previsione
+    MIN_READINGS = 3
+    # Limiti di misura dei CGM (mg/dL)
+    MIN_VALUE = 40
+    MAX_VALUE = 400
+
+    def __init__(self):
+        self.reset()
+
+    @classmethod
+    def state_key(cls, source: str) -> str:
+        """Chiave dello stato salvato: ogni sorgente ha il proprio filtro"""
+        return f"{cls.STATE_KEY}:{source}"
+
+    def reset(self):
+        """Azzera il filtro"""
+        self.timestamp = None
+        self.readings = 0
+        self.value = 0.0
+        self.rate = 0.0
+        # Covarianza dello stato (matrice simmetrica 2x2)
+        self.p00 = self.p01 = self.p11 = 0.0
+
+    def update(self, timestamp: float, value: float) -> bool:
+        """
+        Aggiorna la stima con una nuova lettura
+
+        Args:
+            timestamp: Istante della lettura (secondi epoch)
+            value: Valore glicemico (mg/dL)
+
+        Returns:
+            True se la lettura è stata usata (False se non più recente dell'ultima)
+        """
+        if self.timestamp is not None and timestamp <= self.timestamp:
+            return False
+
+        if self.timestamp is None or timestamp - self.timestamp > self.MAX_GAP:
+            # Prima lettura o dati interrotti: la tendenza è sconosciuta
+            self.timestamp = timestamp
+            self.readings = 1
+            self.value = float(value)
+            self.rate = 0.0
+            self.p00 = self.MEASUREMENT_NOISE
+            self.p01 = 0.0
+            self.p11 = self.INITIAL_RATE_VARIANCE
+            return True
+
+        # Predizione fino all'istante della lettura (dt in minuti)
+        dt = (timestamp - self.timestamp) / 60.0
+        q = self.PROCESS_NOISE
+        value_prior = self.value + dt * self.rate
+        p00 = self.p00 + 2 * dt * self.p01 + dt * dt * self.p11 + q * dt ** 3 / 3
+        p01 = self.p01 + dt * self.p11 + q * dt ** 2 / 2
+        p11 = self.p11 + q * dt
+
+        # Correzione con la lettura
+        innovation = value - value_prior
+        s = p00 + self.MEASUREMENT_NOISE
+        k0 = p00 / s
+        k1 = p01 / s
+        self.value = value_prior + k0 * innovation
+        self.rate += k1 * innovation
+        self.p00 = (1 - k0) * p00
+        self.p01 = (1 - k0) * p01
+        self.p11 = p11 - k1 * p01
+
+        self.timestamp = timestamp
+        self.readings += 1
+        return True
+
+    def predict(self, minutes: float, now: Optional[float] = None) -> Optional[float]:
+        """
+        Prevede il valore dopo 'minutes' minuti dall'istante corrente
+
+        Args:
+            minutes: Orizzonte di previsione (minuti)
+            now: Istante corrente (secondi epoch), di default quello
+                dell'ultima lettura; se l'ultima lettura è troppo vecchia
+                non viene fatta alcuna previsione
+
+        Returns:
+            Valore previsto (mg/dL) o None se la stima non è affidabile
+        """
+        if self.readings < self.MIN_READINGS:
+            return None
+        if now is not None:
+            if now - self.timestamp > 3 * READING_INTERVAL:
+                return None
+            # L'orizzonte parte da adesso, non dall'istante dell'ultima lettura
+            minutes += max(now - self.timestamp, 0) / 60.0
+        predicted = self.value + self.rate * minutes
+        return min(max(predicted, self.MIN_VALUE), self.MAX_VALUE)
+
+    def forecast(self, now: Optional[float] = None) -> Dict[int, float]:
+        """Restituisce le previsioni per gli orizzonti standard (vuoto se non affidabili)"""
+        predictions = {}
+        for minutes in self.HORIZONS:
+            predicted = self.predict(minutes, now)
+            if predicted is None:
+                return {}
+            predictions[minutes] = predicted
+        return predictions
+
+    def to_json(self) -> str:
+        """Serializza lo stato del filtro"""
+        return json.dumps({
+            "timestamp": self.timestamp,
+            "readings": self.readings,
+            "value": self.value,
+            "rate": self.rate,
+            "covariance": [self.p00, self.p01, self.p11],
+        })
+
+    def load_json(self, data: Optional[str]) -> bool:
+        """
+        Ripristina lo stato salvato con to_json
+
+        Returns:
+            True se lo stato è stato ripristinato
+        """
+        if not data:
+            return False
+        try:
+            state: Dict[str, Any] = json.loads(data)
+            self.timestamp = state["timestamp"]
+            self.readings = int(state["readings"])
+            self.value = float(state["value"])
+            self.rate = float(state["rate"])
+            self.p00, self.p01, self.p11 = (float(v) for v in state["covariance"])
+            return True
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Stato della previsione non valido: {e}")
+            self.reset()
+            return False
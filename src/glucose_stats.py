@@ -0,0 +1,105 @@
+"""
+Glik - A Nightscout desktop viewer
+Copyright (C) 2025 Emmanuele Pani
+
+Statistiche glicemiche vettorizzate sulla cronologia locale
+"""
+
+from typing import Optional, Dict, Any
+
+import numpy as np
+
+from .readings import READING_INTERVAL
+
+# Fasce glicemiche di riferimento (mg/dL), secondo il consenso internazionale
+DEFAULT_TARGET_LOW = 70
+DEFAULT_TARGET_HIGH = 180
+VERY_LOW = 54
+VERY_HIGH = 250
+
+# Durata minima (secondi) di un episodio di ipo/iperglicemia
+MIN_EVENT_DURATION = 15 * 60
+
+# Intervallo (secondi) oltre il quale due letture non sono considerate contigue
+MAX_GAP = 3 * READING_INTERVAL
+
+
+def count_events(timestamps: np.ndarray, mask: np.ndarray,
+                 min_duration: float = MIN_EVENT_DURATION) -> int:
+    """
+    Conta gli episodi: sequenze contigue di letture che soddisfano la
+    condizione per almeno 'min_duration' secondi
+
+    Un buco nei dati più lungo di MAX_GAP chiude l'episodio in corso.
+
+    Args:
+        timestamps: Istanti delle letture (secondi epoch, ordine crescente)
+        mask: Condizione valutata su ogni lettura (es. valori < 70)
+        min_duration: Durata minima di un episodio (secondi)
+    """
+    if not mask.any():
+        return 0
+
+    gap = np.diff(timestamps) > MAX_GAP
+    # Un episodio inizia dove la condizione diventa vera o dopo un buco,
+    # e finisce dove diventa falsa o prima di un buco
+    starts = mask & np.concatenate(([True], ~mask[:-1] | gap))
+    ends = mask & np.concatenate((~mask[1:] | gap, [True]))
+    durations = timestamps[ends] - timestamps[starts] + READING_INTERVAL
+    return int(np.count_nonzero(durations >= min_duration))
+
+
+def compute_stats(timestamps: np.ndarray, values: np.ndarray,
+                  target_low: float = DEFAULT_TARGET_LOW,
+                  target_high: float = DEFAULT_TARGET_HIGH) -> Optional[Dict[str, Any]]:
+    """
+    Calcola le statistiche glicemiche di un intervallo
+
+    Args:
+        timestamps: Istanti delle letture (secondi epoch, ordine crescente)
+        values: Valori glicemici (mg/dL)
+        target_low: Limite inferiore dell'intervallo obiettivo (mg/dL)
+        target_high: Limite superiore dell'intervallo obiettivo (mg/dL)
+
+    Returns:
+        Dizionario con numero di letture, copertura del sensore (%),
+        media, deviazione standard, CV (%), GMI (%), percentuali di tempo
+        per fascia ed episodi di ipo/iperglicemia; None se non ci sono letture
+    """
+    count = len(values)
+    if count == 0:
+        return None
+
+    values = np.asarray(values, dtype=np.float64)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+
+    mean = float(values.mean())
+    sd = float(values.std(ddof=1)) if count > 1 else 0.0
+
+    very_low = values < VERY_LOW
+    low = values < target_low
+    high = values > target_high
+    very_high = values > VERY_HIGH
+
+    # Letture attese nell'intervallo coperto, per la copertura del sensore
+    expected = (timestamps[-1] - timestamps[0]) / READING_INTERVAL + 1
+
+    def percent(mask):
+        return 100.0 * float(np.count_nonzero(mask)) / count
+
+    return {
+        "count": count,
+        "coverage": min(100.0, float(100.0 * count / expected)),
+        "mean": mean,
+        "sd": sd,
+        "cv": 100.0 * sd / mean if mean else 0.0,
+        # Glucose Management Indicator (Bergenstal et al., 2018)
+        "gmi": 3.31 + 0.02392 * mean,
+        "time_in_range": percent(~low & ~high),
+        "time_below_range": percent(low),
+        "time_very_low": percent(very_low),
+        "time_above_range": percent(high),
+        "time_very_high": percent(very_high),
+        "low_events": count_events(timestamps, low),
+        "high_events": count_events(timestamps, high),
+    }
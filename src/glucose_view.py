@@ -0,0 +1,125 @@
+"""
+Glik - A Nightscout desktop viewer
+Copyright (C) 2025 Emmanuele Pani
+
+Modello di vista del valore glicemico con aggiornamenti differenziali
+"""
+
+# Foglio di stile del valore glicemico: il colore dipende dalla proprietà
+# dinamica 'range', così cambiarlo non richiede di rianalizzare il CSS
+GLUCOSE_LABEL_STYLE = """
+    QLabel {
+        font-size: 72px;
+        font-weight: bold;
+        color: #ffffff;
+        padding: 10px;
+    }
+    QLabel[range="high"] {
+        color: #FF4444;
+    }
+    QLabel[range="low"] {
+        color: #FFaa44;
+    }
+    QLabel[range="in_range"] {
+        color: #44FF44;
+    }
+"""
+
+def glucose_range(glucose_value) -> str:
+    """Restituisce la fascia glicemica del valore"""
+    if glucose_value > 180:
+        return "high"
+    if glucose_value < 70:
+        return "low"
+    return "in_range"
+
+
+class GlucoseViewModel:
+    """
+    Confronta la lettura in arrivo con quella mostrata e applica ai widget
+    solo le proprietà effettivamente cambiate
+
+    Mentre la finestra è nascosta viene aggiornato solo il system tray:
+    lo stato delle etichette resta in attesa e viene applicato con un
+    unico aggiornamento quando la finestra torna visibile.
+    """
+
+    def __init__(self, glucose_label, info_label, update_tray):
+        """
+        Args:
+            glucose_label: Etichetta del valore glicemico
+            info_label: Etichetta di trend, delta e orario
+            update_tray: Funzione che aggiorna il system tray
+                (valore, trend, orario)
+        """
+        self.glucose_label = glucose_label
+        self.info_label = info_label
+        self.update_tray = update_tray
+        self.glucose_label.setStyleSheet(GLUCOSE_LABEL_STYLE)
+        self.visible = True
+
+        # Stato da mostrare
+        self.value_text = glucose_label.text()
+        self.info_text = info_label.text()
+        self.range = None
+        self.tray_state = None
+
+        # Stato attualmente applicato ai widget
+        self._shown_value_text = self.value_text
+        self._shown_info_text = self.info_text
+        self._shown_range = None
+
+    def set_visible(self, visible: bool):
+        """Segnala se la finestra è visibile, applicando lo stato in attesa"""
+        self.visible = visible
+        if visible:
+            self._apply()
+
+    def show_reading(self, glucose_value, trend: str, info_text: str, local_time: str):
+        """Mostra una lettura glicemica"""
+        self.value_text = f"{glucose_value}"
+        self.info_text = info_text
+        self.range = glucose_range(glucose_value)
+        self._apply()
+
+        tray_state = (glucose_value, trend, local_time)
+        if tray_state != self.tray_state:
+            self.tray_state = tray_state
+            self.update_tray(*tray_state)
+
+    def clear(self, info_text: str = ""):
+        """Rimuove la lettura mostrata, in attesa di quella della nuova sorgente"""
+        self.value_text = "Caricamento..."
+        self.info_text = info_text
+        self.range = None
+        self._apply()
+        self.tray_state = None
+
+    def show_error(self, info_text: str):
+        """Mostra un messaggio di errore al posto del valore"""
+        self.value_text = "Errore"
+        self.info_text = info_text
+        self._apply()
+        # Il tooltip del tray mostra l'errore: va ripristinato alla prossima lettura
+        self.tray_state = None
+
+    def _apply(self):
+        """Applica ai widget le sole proprietà cambiate, se la finestra è visibile"""
+        if not self.visible:
+            return
+
+        if self.value_text != self._shown_value_text:
+            self._shown_value_text = self.value_text
+            self.glucose_label.setText(self.value_text)
+
+        if self.info_text != self._shown_info_text:
+            self._shown_info_text = self.info_text
+            self.info_label.setText(self.info_text)
+
+        if self.range != self._shown_range:
+            self._shown_range = self.range
+            self.glucose_label.setProperty("range", self.range)
+            # Ricalcola lo stile del solo widget interessato
+            style = self.glucose_label.style()
+            style.unpolish(self.glucose_label)
+            style.polish(self.glucose_label)
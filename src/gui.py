@@ -16,41 +16,58 @@ You should have received a copy of the GNU Affero General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-import json
 import hashlib
+import time
 from PyQt5.QtWidgets import (QMainWindow, QSystemTrayIcon, QAction, QMenu, QLabel, 
                             QVBoxLayout, QWidget, QStyle, QMessageBox, QDialog,
                             QFrame, QPushButton, QHBoxLayout,)
-from PyQt5.QtGui import QIcon, QPalette, QColor, QKeySequence, QPixmap, QPainter, QFont, QPen, QFontMetrics, QBrush, QPainterPath
-from PyQt5.QtCore import Qt, QTimer, QPoint
-import requests
-from .config_dialog import ConfigDialog
-from .about_dialog import AboutDialog
-from .welcome_dialog import WelcomeDialog
-from .help_dialog import HelpDialog
-from .dexcom_client import DexcomClient
+from PyQt5.QtGui import QPalette, QKeySequence, QFontMetrics, QBrush, QPainterPath
+from PyQt5.QtCore import Qt, QTimer, QPoint, QThread, pyqtSignal
+from .fetch_worker import FetchWorker
+from .poll_scheduler import PollScheduler
+from .history_store import HistoryStore, source_id
+from .tray_icon_renderer import TrayIconRenderer
+from .theme_monitor import ThemeMonitor
+from .glucose_view import GlucoseViewModel
+from .glucose_forecast import GlucoseForecast
+from .readings import reading_timestamp, STALE_AFTER
+from .startup_profiler import profiler
+from .single_instance import SHOW_COMMAND, REFRESH_COMMAND
 import sys
 import os.path
-from .crypto import ConfigCrypto
-from .resources import get_logo_path, get_resource_path
-import darkdetect
+from .config_store import ConfigStore, DEFAULT_CONFIG
+from .resources import get_logo_icon
 
 class MainWindow(QMainWindow):
+    # Segnali verso il worker di rete (consegnati in coda sul suo thread)
+    fetch_requested = pyqtSignal()
+    worker_config_changed = pyqtSignal(dict)
+    
+    # Attesa (ms) del termine dei thread all'uscita, dopo aver interrotto le richieste
+    THREAD_STOP_TIMEOUT = 2000
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Glik")
         self.resize(800, 600)
         
         # Imposta l'icona per tutte le finestre
-        app_icon = QIcon(get_logo_path())
+        app_icon = get_logo_icon()
         self.setWindowIcon(app_icon)
         
         # Imposta l'icona nella barra delle applicazioni
         self.tray_icon = QSystemTrayIcon(self)
         self.tray_icon.setIcon(app_icon)
         
+        # Il pianificatore viene creato dopo il caricamento della configurazione
+        self.scheduler = None
+        
         # Inizializza la configurazione prima di tutto
+        profiler.begin("config decrypt")
+        self.config_store = ConfigStore(parent=self)
+        self.config_store.changed.connect(self.on_config_file_changed)
         self.load_config()
+        profiler.end("config decrypt")
         
         # Imposta tema scuro
         self.set_dark_theme()
@@ -78,12 +95,6 @@ class MainWindow(QMainWindow):
         
         # Etichetta per il valore corrente
         self.glucose_label = QLabel("Caricamento...")
-        self.glucose_label.setStyleSheet("""
-            font-size: 72px;
-            font-weight: bold;
-            color: #ffffff;
-            padding: 10px;
-        """)
         self.glucose_label.setAlignment(Qt.AlignCenter)
         
         # Etichetta per il trend e il timestamp
@@ -95,8 +106,23 @@ class MainWindow(QMainWindow):
         """)
         self.info_label.setAlignment(Qt.AlignCenter)
         
+        # Etichetta per le statistiche sulla cronologia
+        self.stats_label = QLabel("")
+        self.stats_label.setStyleSheet("""
+            font-size: 12px;
+            color: #888888;
+            padding: 5px;
+        """)
+        self.stats_label.setAlignment(Qt.AlignCenter)
+        self.stats_refresh_pending = False
+        self.stats_outdated = False
+        
         glucose_layout.addWidget(self.glucose_label)
         glucose_layout.addWidget(self.info_label)
+        glucose_layout.addWidget(self.stats_label)
+        
+        # Modello di vista: aggiorna solo le proprietà cambiate
+        self.glucose_view = GlucoseViewModel(self.glucose_label, self.info_label, self.update_tray_icon)
         
         # Bottone di refresh
         self.refresh_button = QPushButton()
@@ -133,18 +159,10 @@ class MainWindow(QMainWindow):
         main_layout.addWidget(glucose_frame)
         self.setCentralWidget(main_widget)
         
-        # Setup dell'autenticazione
-        self.headers = {
-            'api-secret': self.config.get('api_secret_sha1', ''),
-            'Content-Type': 'application/json'
-        }
-        
-        # Inizializza il client Dexcom se necessario
-        self.dexcom_client = None
+        # Verifica se pydexcom è disponibile per la configurazione Dexcom
         if self.config.get("connection_type") == "Dexcom Share":
-            # Verifica se pydexcom è disponibile
-            temp_client = DexcomClient()
-            if not temp_client.is_available():
+            from . import dexcom_client
+            if not dexcom_client.is_available():
                 print("pydexcom non disponibile. Configurazione Dexcom non può essere utilizzata.")
                 # Cambia automaticamente a Nightscout se Dexcom non è disponibile
                 self.config["connection_type"] = "Nightscout"
@@ -152,109 +170,84 @@ class MainWindow(QMainWindow):
                     "pydexcom non è installato. La configurazione è stata cambiata automaticamente a Nightscout.\n\n"
                     "Per usare Dexcom Share, installa la libreria:\n"
                     "pip install pydexcom")
-            else:
-                self.dexcom_client = DexcomClient(
-                    username=self.config.get("dexcom_username", ""),
-                    password=self.config.get("dexcom_password", ""),
-                    region=self.config.get("dexcom_region", "ous")
-                )
+        
+        # Archivio locale della cronologia glicemica
+        self.history_store = HistoryStore()
+        
+        # Sito o account delle letture mostrate
+        self.data_source = source_id(self.config)
+        # Ultima lettura mostrata: età e previsione vanno ricalcolate
+        # anche quando le richieste successive non portano letture nuove
+        self.last_entry = None
+        
+        # Previsione a breve termine, ripresa dallo stato salvato per la sorgente
+        self.forecast = GlucoseForecast()
+        self.load_forecast()
+        
+        # Worker per il recupero dei dati in un thread separato
+        self.fetch_in_progress = False
+        self.fetch_thread = QThread(self)
+        self.fetch_worker = FetchWorker(self.history_store)
+        self.fetch_worker.moveToThread(self.fetch_thread)
+        self.fetch_worker.data_ready.connect(self.on_glucose_data)
+        self.fetch_worker.fetch_failed.connect(self.on_fetch_failed)
+        self.fetch_worker.fetch_finished.connect(self.on_fetch_finished)
+        self.fetch_requested.connect(self.fetch_worker.fetch)
+        self.worker_config_changed.connect(self.fetch_worker.set_config)
+        self.fetch_thread.finished.connect(self.fetch_worker.deleteLater)
+        self.fetch_thread.start()
+        self.worker_config_changed.emit(self.config)
         
         # Setup system tray (spostato qui)
         self.setup_system_tray()
+        self.tray_renderer = TrayIconRenderer()
+        self.tray_icon_current = None
+        self.tray_state = None
         
-        # Timer per aggiornamento dati
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.fetch_glucose_data)
-        refresh_interval = self.config.get("refresh_interval", 30) * 1000
-        self.timer.start(refresh_interval)
+        # Tema del sistema, aggiornato solo quando cambia
+        self.theme_monitor = ThemeMonitor(self)
+        self.theme_monitor.theme_changed.connect(self.on_theme_changed)
         
-        # Primo caricamento dati
-        self.fetch_glucose_data()
+        # Pianificatore degli aggiornamenti basato sulle letture previste
+        self.scheduler = PollScheduler(self.config.get("refresh_interval", 30), self)
+        self.scheduler.poll.connect(self.fetch_glucose_data)
+        self.scheduler.set_source(self.config.get("connection_type", "Nightscout"))
+        self.fetch_error = False
+        
+        # Scaricamento della cronologia in background
+        self.backfill_thread = None
+        self.backfill = None
+        self.backfill_restart_pending = False
+        
+        # Canale in tempo reale di Nightscout (opzionale)
+        self.stream = None
+        
+        # Mostra subito l'ultima lettura salvata, in attesa di quella aggiornata
+        self.show_last_known_reading()
         
         # Mostra la finestra
         self.show()
+        
+        # Le richieste di rete partono dopo il primo disegno della finestra
+        QTimer.singleShot(0, self.start_data_sources)
 
     def load_config(self):
         """Carica la configurazione"""
         try:
-            crypto = ConfigCrypto()
-            
-            # Usa AppData per salvare la configurazione
-            config_dir = os.path.join(os.getenv('APPDATA'), 'Glik')
-            config_path = os.path.join(config_dir, 'config.json')
-            
-            # Assicurati che la directory esista
-            os.makedirs(config_dir, exist_ok=True)
-            
             # Prova a caricare da percorsi legacy per migrazione
             legacy_paths = [
                 os.path.join(os.path.dirname(sys.executable), "config.json") if getattr(sys, 'frozen', False) else None,
                 os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.json")
             ]
             
-            config_loaded = False
-            
-            # Prima prova a caricare da APPDATA
-            if os.path.exists(config_path):
-                try:
-                    with open(config_path, "r") as f:
-                        encrypted_config = f.read()
-                    self.config = crypto.decrypt_config(encrypted_config)
-                    if self.config:
-                        config_loaded = True
-                except Exception as e:
-                    print(f"Errore nel caricare da APPDATA: {e}")
-            
-            # Se non è stato caricato da APPDATA, prova i percorsi legacy
-            if not config_loaded:
-                for legacy_path in legacy_paths:
-                    if legacy_path and os.path.exists(legacy_path):
-                        try:
-                            with open(legacy_path, "r") as f:
-                                legacy_config = f.read()
-                            
-                            # Prova a decifrare o caricare come JSON semplice
-                            if legacy_config.strip().startswith('{'):
-                                # Probabilmente JSON non cifrato
-                                self.config = json.loads(legacy_config)
-                            else:
-                                # Prova a decifrare
-                                self.config = crypto.decrypt_config(legacy_config)
-                            
-                            if self.config:
-                                # Migra la configurazione in APPDATA
-                                encrypted_config = crypto.encrypt_config(self.config)
-                                with open(config_path, "w") as f:
-                                    f.write(encrypted_config)
-                                config_loaded = True
-                                print("Configurazione migrata con successo in APPDATA")
-                                break
-                        except Exception as e:
-                            print(f"Errore nel caricare da {legacy_path}: {e}")
-                            continue
+            # Prima prova a caricare da APPDATA, poi dai percorsi legacy
+            config_loaded = self.config_store.load() or self.config_store.load_legacy(legacy_paths)
+            self.config = dict(self.config_store.config)
             
             # Se ancora non è stato caricato, crea una configurazione di default
             if not config_loaded:
-                default_config = {
-                    "connection_type": "Nightscout",
-                    "nightscout_url": "",
-                    "api_secret": "",
-                    "api_secret_sha1": "",
-                    "dexcom_username": "",
-                    "dexcom_password": "",
-                    "dexcom_region": "ous",
-                    "dark_mode": True,
-                    "minimize_to_tray": True,
-                    "refresh_interval": 30,
-                    "autostart": False
-                }
-                
-                # Cifra e salva la configurazione di default
-                encrypted_config = crypto.encrypt_config(default_config)
-                with open(config_path, "w") as f:
-                    f.write(encrypted_config)
-                
-                self.config = default_config
+                self.config = dict(DEFAULT_CONFIG)
+                self.config_store.save(self.config, immediate=True)
                 
                 # Mostra il dialog di benvenuto
                 from .welcome_dialog import WelcomeDialog
@@ -262,9 +255,7 @@ class MainWindow(QMainWindow):
                 if dialog.exec_() == QDialog.Accepted:
                     self.config = dialog.get_config()
                     # Salva la nuova configurazione
-                    encrypted_config = crypto.encrypt_config(self.config)
-                    with open(config_path, "w") as f:
-                        f.write(encrypted_config)
+                    self.config_store.save(self.config, immediate=True)
             
             # Se non c'è configurazione valida, mostra il dialog di configurazione
             connection_type = self.config.get("connection_type", "Nightscout")
@@ -336,6 +327,11 @@ class MainWindow(QMainWindow):
         settings_action.triggered.connect(self.show_config_dialog)
         tools_menu.addAction(settings_action)
         
+        agp_action = QAction("Profilo glicemico (AGP)", self)
+        agp_action.setShortcut(QKeySequence("Ctrl+G"))
+        agp_action.triggered.connect(self.show_agp_report)
+        tools_menu.addAction(agp_action)
+        
         # Menu Info
         info_menu = menubar.addMenu("Info")
         info_menu.setStyleSheet("""
@@ -379,9 +375,14 @@ class MainWindow(QMainWindow):
                 background-color: #2d2d2d;
                 color: white;
             }
+            QStatusBar {
+                background-color: #2d2d2d;
+                color: #cccccc;
+            }
         """)
 
     def show_config_dialog(self):
+        from .config_dialog import ConfigDialog
         dialog = ConfigDialog(self)
         dialog.set_config(self.config)
         
@@ -390,51 +391,63 @@ class MainWindow(QMainWindow):
             self.config.update(new_config)
             
             try:
-                # Usa il percorso corretto per il config.json (APPDATA)
-                config_dir = os.path.join(os.getenv('APPDATA'), 'Glik')
-                config_path = os.path.join(config_dir, 'config.json')
-                
-                # Assicurati che la directory esista
-                os.makedirs(config_dir, exist_ok=True)
+                # Cifra e salva la configurazione (scrittura atomica)
+                self.config_store.save(self.config, immediate=True)
                 
-                # Cifra e salva la configurazione
-                crypto = ConfigCrypto()
-                encrypted_config = crypto.encrypt_config(self.config)
+                # Verifica che pydexcom sia disponibile per Dexcom Share
+                from . import dexcom_client
+                if new_config.get("connection_type") == "Dexcom Share" and not dexcom_client.is_available():
+                    QMessageBox.warning(self, "Avviso", 
+                        "pydexcom non è installato. Per usare Dexcom Share, installa la libreria:\n\n"
+                        "pip install pydexcom\n\n"
+                        "Oppure usa Nightscout come alternativa.")
+                    return
                 
-                with open(config_path, "w") as f:
-                    f.write(encrypted_config)
-                
-                # Aggiorna gli headers se necessario
-                if new_config.get("connection_type") == "Nightscout":
-                    self.headers = {
-                        'api-secret': self.config['api_secret_sha1'],
-                        'Content-Type': 'application/json'
-                    }
-                else:
-                    # Aggiorna il client Dexcom
-                    if not self.dexcom_client or not self.dexcom_client.is_available():
-                        QMessageBox.warning(self, "Avviso", 
-                            "pydexcom non è installato. Per usare Dexcom Share, installa la libreria:\n\n"
-                            "pip install pydexcom\n\n"
-                            "Oppure usa Nightscout come alternativa.")
-                        return
-                    
-                    self.dexcom_client = DexcomClient(
-                        username=self.config.get("dexcom_username", ""),
-                        password=self.config.get("dexcom_password", ""),
-                        region=self.config.get("dexcom_region", "ous")
-                    )
-                
-                # Aggiorna l'intervallo del timer
-                self.timer.setInterval(new_config["refresh_interval"] * 1000)
-                
-                # Ricarica i dati
-                self.fetch_glucose_data()
+                # Aggiorna worker e pianificatore e ricarica i dati
+                self.apply_config()
                 
                 QMessageBox.information(self, "Successo", "Configurazione salvata con successo!")
             except Exception as e:
                 QMessageBox.critical(self, "Errore", f"Errore nel salvare la configurazione: {str(e)}")
 
+    def apply_config(self):
+        """Applica la configurazione corrente a worker, pianificatore e canali"""
+        if self.scheduler is None:
+            # Durante l'avvio la configurazione viene applicata da __init__
+            return
+        
+        # Con un altro sito o account la lettura mostrata non è più valida
+        data_source = source_id(self.config)
+        if data_source != self.data_source:
+            self.data_source = data_source
+            self.last_entry = None
+            self.load_forecast()
+            self.glucose_view.clear()
+            self.tray_state = None
+            self.tray_icon_current = None
+            self.tray_icon.setIcon(get_logo_icon())
+            self.tray_icon.setToolTip("Glik")
+            self.show_last_known_reading()
+        
+        # Aggiorna la configurazione del worker (headers e client Dexcom)
+        self.worker_config_changed.emit(self.config)
+        self.scheduler.set_source(self.config.get("connection_type", "Nightscout"))
+        
+        # Aggiorna l'intervallo di ripiego del pianificatore
+        self.scheduler.set_fallback_interval(self.config.get("refresh_interval", 30))
+        
+        # Ricarica i dati e le statistiche (le fasce potrebbero essere cambiate)
+        self.fetch_glucose_data()
+        self.start_history_backfill()
+        self.start_stream()
+        self.schedule_stats_refresh()
+
+    def on_config_file_changed(self, config):
+        """Applica la configurazione modificata da un altro processo"""
+        print("Configurazione modificata esternamente, ricaricamento")
+        self.config = config
+        self.apply_config()
+
     def setup_system_tray(self):
         self.tray_icon = QSystemTrayIcon(self)
         self.tray_icon.setIcon(self.style().standardIcon(QStyle.SP_ComputerIcon))
@@ -477,6 +490,15 @@ class MainWindow(QMainWindow):
             self.show()
             self.activateWindow()
 
+    def handle_instance_commands(self, commands):
+        """Esegue i comandi inviati da una nuova istanza di Glik"""
+        if SHOW_COMMAND in commands:
+            self.showNormal()
+            self.raise_()
+            self.activateWindow()
+        if REFRESH_COMMAND in commands:
+            self.fetch_glucose_data()
+
     def closeEvent(self, event):
         if self.config.get("minimize_to_tray", True) and self.tray_icon.isVisible():
             QMessageBox.information(self, "Glik",
@@ -485,212 +507,345 @@ class MainWindow(QMainWindow):
             self.hide()
             event.ignore()
         else:
+            # La finestra sparisce subito anche se un thread va ancora atteso
+            self.hide()
+            self.tray_icon.hide()
+            self.scheduler.stop()
+            self.stop_stream()
+            self.stop_history_backfill()
+            self.stop_fetch_thread()
+            self.history_store.close()
+            self.config_store.close()
             event.accept()
 
-    def update_tray_icon(self, glucose_value, trend, color, local_time):
-        # Crea un'icona personalizzata con il valore glicemico
-        pixmap = QPixmap(32, 32)
-        pixmap.fill(Qt.transparent)
+    def update_tray_icon(self, glucose_value, trend, local_time):
+        self.tray_state = (glucose_value, trend, local_time)
         
-        painter = QPainter(pixmap)
-        painter.setRenderHint(QPainter.Antialiasing)
+        # Icona con il valore glicemico, disegnata solo se non già in cache
+        # (il testo segue il tema del sistema, non la fascia glicemica)
+        icon = self.tray_renderer.icon(glucose_value, self.theme_monitor.dark, self.devicePixelRatioF())
+        if icon is not self.tray_icon_current:
+            self.tray_icon.setIcon(icon)
+            self.tray_icon_current = icon
         
-        # Converti il valore in stringa
-        text = str(glucose_value)
-        if len(text) > 3:
-            text = text[:3]
+        # Aggiorna il tooltip con la freccia di tendenza
+        self.tray_icon.setToolTip(f"Glicemia: {glucose_value} mg/dL {trend} | Aggiornato: {local_time}")
 
-        # Imposta il font in base alla lunghezza del valore
-        if len(text) <= 2:
-            font_size = 24
-        elif len(text) == 3:
-            font_size = 22
-        else:
-            font_size = 20
+    def on_theme_changed(self, dark):
+        """Ridisegna l'icona del tray con il nuovo tema"""
+        if self.tray_state:
+            self.update_tray_icon(*self.tray_state)
 
-        # Imposta il font
-        font = QFont("Arial", font_size, QFont.Bold)
-        painter.setFont(font)
+    def fetch_glucose_data(self):
+        """Richiede al worker una nuova lettura senza bloccare la GUI"""
+        if self.fetch_in_progress:
+            # Una richiesta è già in corso, evita di accodarne altre
+            return
         
-        # Calcola il rettangolo del testo
-        text_rect = painter.fontMetrics().boundingRect(text)
+        self.fetch_in_progress = True
+        self.fetch_error = False
         
-        # Calcola il fattore di scala per adattare il testo mantenendo le proporzioni
-        scale_w = 31.0 / text_rect.width()   # Usa quasi tutto lo spazio disponibile
-        scale_h = 31.0 / text_rect.height()  # Usa quasi tutto lo spazio disponibile
-        scale = min(scale_w, scale_h)  # Usa il fattore più piccolo per mantenere le proporzioni
+        # Il bottone resta disabilitato finché la richiesta è in corso
+        self.refresh_button.setEnabled(False)
+        self.refresh_button.setToolTip("Caricamento...")
         
-        # Applica la trasformazione per centrare perfettamente
-        painter.translate(16, 16)  # Sposta al centro dell'icona
-        painter.scale(scale, scale)  # Scala il testo
-        painter.translate(-text_rect.width()/2, text_rect.height()/3)  # Aggiustato per centrare verticalmente
+        profiler.begin("first fetch")
+        self.fetch_requested.emit()
+    
+    def start_data_sources(self):
+        """Avvia il primo caricamento, la cronologia e il canale in tempo reale"""
+        # Primo caricamento dati (pianifica anche i successivi)
+        self.fetch_glucose_data()
+        self.start_history_backfill()
+        self.start_stream()
+    
+    def show_last_known_reading(self):
+        """Mostra l'ultima lettura dell'archivio locale, senza attendere la rete"""
+        try:
+            latest = self.history_store.latest(self.data_source)
+        except Exception as e:
+            print(f"Errore nel leggere l'ultima lettura salvata: {str(e)}")
+            return
+        if latest:
+            self.on_glucose_data(latest)
+    
+    def on_glucose_data(self, entry):
+        """Aggiorna la GUI con la lettura ricevuta dal worker"""
+        if entry.get("source", self.data_source) != self.data_source:
+            # Richiesta partita prima del cambio di sito o account
+            return
+        self.last_entry = entry
+        reading_time = reading_timestamp(entry)
+        self.update_forecast(reading_time, entry["sgv"])
+        self.show_last_reading()
+        
+        # Registra l'orario della lettura per prevedere la successiva
+        self.scheduler.reading_received(reading_time)
+        
+        # Aggiorna le statistiche includendo la nuova lettura
+        self.schedule_stats_refresh()
+    
+    def show_last_reading(self):
+        """Mostra l'ultima lettura con età e previsione calcolate adesso"""
+        entry = self.last_entry
+        glucose_value = entry["sgv"]
+        direction = entry.get("direction", "")
+        timestamp = entry.get("dateString", "")
+        delta = entry.get("delta")
+        slope = entry.get("slope")
+        
+        # Converti il timestamp in formato locale
+        from datetime import datetime
+        try:
+            dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+            local_time = dt.astimezone().strftime("%H:%M")
+        except:
+            local_time = timestamp
+        
+        # Converti le frecce di direzione secondo Nightscout
+        trend_arrows = {
+            "DoubleUp": "⇈",
+            "SingleUp": "↑",
+            "FortyFiveUp": "↗",
+            "Flat": "→",
+            "FortyFiveDown": "↘",
+            "SingleDown": "↓",
+            "DoubleDown": "⇊",
+            "NOT COMPUTABLE": "-",
+            "RATE OUT OF RANGE": "⚡"
+        }
         
-        # Disegna il contorno usando darkdetect
-        if darkdetect.isDark():
-            # Tema scuro - contorno bianco
-            painter.setPen(QPen(QColor(255, 255, 255), 4))
-        else:
-            # Tema chiaro - contorno nero
-            painter.setPen(QPen(QColor(0, 0, 0), 4))
-            
-        painter.drawText(0, 0, text)
+        trend = trend_arrows.get(direction, "")
         
-        # Disegna il valore con il colore basato sul tema
-        if darkdetect.isDark():
-            # Tema scuro - numero bianco
-            painter.setPen(QColor(255, 255, 255))
-        else:
-            # Tema chiaro - numero nero
-            painter.setPen(QColor(0, 0, 0))
-            
-        painter.drawText(0, 0, text)
+        # Segnala le letture non aggiornate (es. all'avvio o senza sensore)
+        updated_text = f"Ultimo aggiornamento: {local_time}"
+        reading_time = reading_timestamp(entry)
+        if reading_time is not None and time.time() - reading_time > STALE_AFTER:
+            minutes = int((time.time() - reading_time) // 60)
+            updated_text += f" ({minutes} min fa)"
         
-        painter.end()
+        # Delta riportato a 5 minuti e pendenza degli ultimi 15 minuti
+        delta_text = f"{delta:+.1f} mg/dL" if delta is not None else "Δ non disponibile"
+        if slope is not None:
+            delta_text += f" · {slope:+.1f} mg/dL/min"
+        if entry.get("gap"):
+            delta_text += " (dati mancanti)"
         
-        # Imposta l'icona
-        self.tray_icon.setIcon(QIcon(pixmap))
+        # Previsione a 15/30/60 minuti
+        forecast_text = self.forecast_text()
         
-        # Aggiorna il tooltip con la freccia di tendenza
-        self.tray_icon.setToolTip(f"Glicemia: {glucose_value} mg/dL {trend} | Aggiornato: {local_time}")
-
-    def fetch_glucose_data(self):
-        try:
-            # Imposta il bottone di refresh come disabilitato durante il caricamento
-            self.refresh_button.setEnabled(False)
-            self.refresh_button.setToolTip("Caricamento...")
-            
-            connection_type = self.config.get("connection_type", "Nightscout")
-            
-            if connection_type == "Nightscout":
-                data = self._fetch_nightscout_data()
-            else:  # Dexcom Share
-                data = self._fetch_dexcom_data()
-            
-            if data:
-                # Aggiorna il valore corrente
-                entry = data[0] if isinstance(data, list) else data
-                glucose_value = entry["sgv"]
-                direction = entry.get("direction", "")
-                timestamp = entry.get("dateString", "")
-                delta = entry.get("delta", 0)
-                
-                # Converti il timestamp in formato locale
-                from datetime import datetime
-                try:
-                    dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                    local_time = dt.astimezone().strftime("%H:%M")
-                except:
-                    local_time = timestamp
-                
-                # Converti le frecce di direzione secondo Nightscout
-                trend_arrows = {
-                    "DoubleUp": "⇈",
-                    "SingleUp": "↑",
-                    "FortyFiveUp": "↗",
-                    "Flat": "→",
-                    "FortyFiveDown": "↘",
-                    "SingleDown": "↓",
-                    "DoubleDown": "⇊",
-                    "NOT COMPUTABLE": "-",
-                    "RATE OUT OF RANGE": "⚡"
-                }
-                
-                trend = trend_arrows.get(direction, "")
-                
-                # Aggiorna le etichette con più informazioni
-                self.glucose_label.setText(f"{glucose_value}")
-                self.info_label.setText(f"{trend} mg/dL\n{delta:+.1f} mg/dL\nUltimo aggiornamento: {local_time}")
-                
-                # Colori standard di Nightscout
-                if glucose_value > 180:
-                    color = "#FF4444"  # Alto
-                elif glucose_value < 70:
-                    color = "#FFaa44"  # Basso
-                else:
-                    color = "#44FF44"  # In range
-                
-                self.glucose_label.setStyleSheet(f"""
-                    font-size: 72px;
-                    font-weight: bold;
-                    color: {color};
-                    padding: 10px;
-                """)
-                
-                # Aggiorna l'icona nel system tray
-                self.update_tray_icon(glucose_value, trend, color, local_time)
-                
-            else:
-                # Se non ci sono dati, mostra un messaggio più specifico
-                connection_type = self.config.get("connection_type", "Nightscout")
-                if connection_type == "Dexcom Share" and self.dexcom_client:
-                    error_msg = self.dexcom_client.last_error or "Nessun dato disponibile da Dexcom"
-                    raise Exception(error_msg)
-                else:
-                    raise Exception("Nessun dato disponibile")
-                
-        except Exception as e:
-            print(f"Errore dettagliato: {str(e)}")
-            self.glucose_label.setText("Errore")
-            self.info_label.setText(str(e))
-        
-        finally:
-            # Riabilita il bottone di refresh
-            self.refresh_button.setEnabled(True)
-            self.refresh_button.setToolTip("Aggiorna dati (R)")
+        # Aggiorna etichette, fascia glicemica e system tray solo se cambiati
+        info_text = f"{trend} mg/dL\n{delta_text}\n{updated_text}{forecast_text}"
+        self.glucose_view.show_reading(glucose_value, trend, info_text, local_time)
     
-    def _fetch_nightscout_data(self):
-        """Recupera i dati da Nightscout"""
+    def load_forecast(self):
+        """Riprende lo stato della previsione della sorgente corrente, o lo azzera"""
+        self.forecast.reset()
         try:
-            api_url = f"{self.config['nightscout_url']}/api/v1/entries.json"
-            
-            params = {
-                'count': 1,  # Torniamo a richiedere solo l'ultima lettura
-                'find[type]': 'sgv'
-            }
-            
-            response = requests.get(api_url, headers=self.headers, params=params)
-            response.raise_for_status()
-            return response.json()
-            
+            self.forecast.load_json(
+                self.history_store.get_meta(GlucoseForecast.state_key(self.data_source))
+            )
         except Exception as e:
-            print(f"Errore Nightscout: {str(e)}")
-            return None
+            print(f"Errore nel leggere lo stato della previsione: {str(e)}")
     
-    def _fetch_dexcom_data(self):
-        """Recupera i dati da Dexcom Share"""
-        try:
-            if not self.dexcom_client:
-                # Ricrea il client se necessario
-                self.dexcom_client = DexcomClient(
-                    username=self.config.get("dexcom_username", ""),
-                    password=self.config.get("dexcom_password", ""),
-                    region=self.config.get("dexcom_region", "ous")
+    def update_forecast(self, reading_time, glucose_value):
+        """Aggiorna la previsione con la lettura e ne salva lo stato"""
+        if reading_time is not None and self.forecast.update(reading_time, glucose_value):
+            try:
+                self.history_store.set_meta(
+                    GlucoseForecast.state_key(self.data_source), self.forecast.to_json()
                 )
-            
-            # Verifica se il client è disponibile
-            if not self.dexcom_client.is_available():
-                print("pydexcom non disponibile. Installa con: pip install pydexcom")
-                return None
-            
-            # Verifica se le credenziali sono impostate
-            if not self.dexcom_client.username or not self.dexcom_client.password:
-                print("Credenziali Dexcom non impostate")
-                return None
-            
-            # Ottieni la cronologia per calcolare il delta
-            data = self.dexcom_client.get_glucose_history(count=2)
-            
-            if not data:
-                # Ottieni l'errore specifico dal client
-                error_msg = self.dexcom_client.last_error or "Errore sconosciuto"
-                print(f"Errore nel recuperare dati Dexcom: {error_msg}")
-                return None
-            
-            return data
-            
+            except Exception as e:
+                print(f"Errore nel salvare lo stato della previsione: {str(e)}")
+    
+    def forecast_text(self):
+        """Testo della previsione da adesso, vuoto se non disponibile"""
+        predictions = self.forecast.forecast(time.time())
+        if not predictions:
+            return ""
+        
+        # Orizzonti misurati da adesso (la lettura può avere qualche minuto)
+        text = "\nPrevisione tra: " + " · ".join(
+            f"{minutes}' {value:.0f}" for minutes, value in predictions.items()
+        )
+        if min(predictions[15], predictions[30]) < self.config.get("target_low", 70):
+            text += "\n⚠ Ipoglicemia prevista entro 30 minuti"
+        return text
+    
+    def schedule_stats_refresh(self):
+        """Ricalcola le statistiche appena gestiti gli eventi in coda"""
+        if not self.stats_refresh_pending:
+            self.stats_refresh_pending = True
+            QTimer.singleShot(0, self.refresh_stats)
+    
+    def refresh_stats(self):
+        """Aggiorna il pannello delle statistiche sulla cronologia locale"""
+        self.stats_refresh_pending = False
+        if not self.isVisible():
+            # Verranno ricalcolate quando la finestra torna visibile
+            self.stats_outdated = True
+            return
+        self.stats_outdated = False
+        
+        from .glucose_stats import compute_stats, DEFAULT_TARGET_LOW, DEFAULT_TARGET_HIGH
+        days = self.config.get("stats_days", 14)
+        start = int((time.time() - days * 24 * 60 * 60) * 1000)
+        try:
+            timestamps, values = self.history_store.get_arrays(source_id(self.config), start)
+            stats = compute_stats(
+                timestamps, values,
+                self.config.get("target_low", DEFAULT_TARGET_LOW),
+                self.config.get("target_high", DEFAULT_TARGET_HIGH)
+            )
         except Exception as e:
-            print(f"Errore Dexcom: {str(e)}")
-            return None
+            print(f"Errore nel calcolo delle statistiche: {str(e)}")
+            return
+        
+        if not stats:
+            self.stats_label.setText("")
+            return
+        
+        self.stats_label.setText(
+            f"Ultimi {days} giorni: in range {stats['time_in_range']:.0f}% · "
+            f"sotto {stats['time_below_range']:.0f}% · sopra {stats['time_above_range']:.0f}%\n"
+            f"Media {stats['mean']:.0f} mg/dL · DS {stats['sd']:.0f} · "
+            f"CV {stats['cv']:.0f}% · GMI {stats['gmi']:.1f}%\n"
+            f"Episodi: {stats['low_events']} ipo · {stats['high_events']} iper"
+        )
+    
+    def on_fetch_failed(self, error_msg):
+        """Mostra l'errore riportato dal worker e lo stato dei tentativi"""
+        print(f"Errore dettagliato: {error_msg}")
+        self.fetch_error = True
+        self.scheduler.fetch_failed()
+        
+        retry_status = self.scheduler.breaker.describe()
+        self.glucose_view.show_error(f"{error_msg}\n{retry_status}")
+        self.tray_icon.setToolTip(f"Glik - Errore: {error_msg}\n{retry_status}")
+    
+    def on_fetch_finished(self):
+        """Riabilita il bottone di refresh al termine della richiesta"""
+        if not self.fetch_error:
+            self.scheduler.fetch_succeeded()
+            if self.last_entry is not None:
+                # Anche senza letture nuove (304 o lista vuota) età e
+                # previsione dell'ultima lettura cambiano col passare del tempo
+                self.show_last_reading()
+        
+        self.fetch_in_progress = False
+        self.refresh_button.setEnabled(True)
+        self.refresh_button.setToolTip("Aggiorna dati (R)")
+        profiler.end("first fetch")
+        
+        # Pianifica la prossima richiesta in base all'ultima lettura
+        self.scheduler.schedule_next()
+
+    def start_stream(self):
+        """Avvia il canale in tempo reale di Nightscout se abilitato"""
+        self.stop_stream()
+        
+        if (self.config.get("connection_type", "Nightscout") != "Nightscout"
+                or not self.config.get("nightscout_url")
+                or not self.config.get("realtime_stream", False)):
+            return
+        
+        from .nightscout_stream import NightscoutStream
+        self.stream = NightscoutStream(
+            self.config.get("nightscout_url", ""),
+            self.config.get("api_secret_sha1", ""),
+            self
+        )
+        self.stream.entries_received.connect(self.fetch_worker.ingest_entries)
+        self.stream.connected.connect(self.on_stream_connected)
+        self.stream.disconnected.connect(self.on_stream_disconnected)
+        self.stream.start()
+    
+    def stop_stream(self):
+        """Chiude il canale in tempo reale e torna al polling"""
+        if self.stream:
+            self.stream.stop()
+            self.stream.deleteLater()
+            self.stream = None
+        self.scheduler.set_streaming(False)
+    
+    def on_stream_connected(self):
+        """Con il canale attivo il polling resta solo come controllo di sicurezza"""
+        print("Canale in tempo reale Nightscout connesso")
+        self.scheduler.set_streaming(True)
+    
+    def on_stream_disconnected(self):
+        """Torna al polling quando il canale si interrompe"""
+        if self.scheduler.streaming:
+            print("Canale in tempo reale Nightscout interrotto, ritorno al polling")
+        self.scheduler.set_streaming(False)
+    
+    def start_history_backfill(self):
+        """Avvia lo scaricamento della cronologia Nightscout mancante"""
+        if self.backfill_thread:
+            # Interrompe lo scaricamento in corso e riparte quando è terminato
+            self.backfill_restart_pending = True
+            self.backfill.cancel()
+            return
+        
+        if self.config.get("connection_type", "Nightscout") != "Nightscout" or not self.config.get("nightscout_url"):
+            return
+        
+        self.backfill_thread = QThread(self)
+        from .history_backfill import HistoryBackfill
+        self.backfill = HistoryBackfill(self.config, self.history_store)
+        self.backfill.moveToThread(self.backfill_thread)
+        self.backfill_thread.started.connect(self.backfill.run)
+        self.backfill.progress.connect(self.on_backfill_progress)
+        self.backfill.finished.connect(self.on_backfill_finished)
+        self.backfill.finished.connect(self.backfill_thread.quit)
+        self.backfill_thread.finished.connect(self.backfill.deleteLater)
+        self.backfill_thread.finished.connect(self.on_backfill_thread_finished)
+        self.backfill_thread.start()
+    
+    def on_backfill_thread_finished(self):
+        """Rilascia il thread di scaricamento ed eventualmente lo riavvia"""
+        self.backfill_thread = None
+        self.backfill = None
+        if self.backfill_restart_pending:
+            self.backfill_restart_pending = False
+            self.start_history_backfill()
+    
+    def stop_history_backfill(self):
+        """Interrompe lo scaricamento della cronologia prima dell'uscita"""
+        self.backfill_restart_pending = False
+        if self.backfill_thread and self.backfill_thread.isRunning():
+            self.backfill.cancel()
+            self.backfill_thread.quit()
+            if not self.backfill_thread.wait(self.THREAD_STOP_TIMEOUT):
+                # Il database non va chiuso finché lo scaricamento lo sta usando
+                print("Attesa del termine dello scaricamento della cronologia...")
+                self.backfill_thread.wait()
+    
+    def on_backfill_progress(self, done, total):
+        """Mostra l'avanzamento dello scaricamento della cronologia"""
+        if total > 1 and self.isVisible():
+            self.statusBar().showMessage(f"Scaricamento cronologia: {done}/{total} giorni")
+    
+    def on_backfill_finished(self, added):
+        """Segnala il termine dello scaricamento della cronologia"""
+        if added:
+            self.statusBar().showMessage(f"Cronologia aggiornata: {added} letture salvate", 5000)
+            self.schedule_stats_refresh()
+        else:
+            self.statusBar().clearMessage()
+
+    def stop_fetch_thread(self):
+        """Ferma il thread del worker prima dell'uscita"""
+        if self.fetch_thread.isRunning():
+            # Una richiesta in corso verrebbe altrimenti attesa fino al timeout
+            self.fetch_worker.abort()
+            self.fetch_thread.quit()
+            if not self.fetch_thread.wait(self.THREAD_STOP_TIMEOUT):
+                # Le richieste Dexcom non si possono interrompere: sessione e
+                # database non vanno chiusi finché il worker li sta usando
+                print("Attesa del termine della richiesta in corso...")
+                self.fetch_thread.wait()
+        self.fetch_worker.shutdown()
 
     def keyPressEvent(self, event):
         # Gestione scorciatoia R per refresh
@@ -700,6 +855,7 @@ class MainWindow(QMainWindow):
 
     def show_about(self):
         """Mostra la finestra delle informazioni"""
+        from .about_dialog import AboutDialog
         dialog = AboutDialog(self)
         dialog.exec_()
 
@@ -710,55 +866,40 @@ class MainWindow(QMainWindow):
 
     def show_welcome(self):
         """Mostra la finestra di benvenuto"""
+        from .welcome_dialog import WelcomeDialog
         dialog = WelcomeDialog(self)
         if dialog.exec_() == QDialog.Accepted:
             config = dialog.get_config()
             self.config.update(config)
             try:
-                # Usa il percorso corretto per il config.json (APPDATA)
-                config_dir = os.path.join(os.getenv('APPDATA'), 'Glik')
-                config_path = os.path.join(config_dir, 'config.json')
-                
-                # Assicurati che la directory esista
-                os.makedirs(config_dir, exist_ok=True)
+                # Cifra e salva la configurazione (scrittura atomica)
+                self.config_store.save(self.config, immediate=True)
                 
-                # Cifra e salva la configurazione
-                crypto = ConfigCrypto()
-                encrypted_config = crypto.encrypt_config(self.config)
+                # Verifica che pydexcom sia disponibile per Dexcom Share
+                from . import dexcom_client
+                if self.config.get("connection_type") == "Dexcom Share" and not dexcom_client.is_available():
+                    QMessageBox.warning(self, "Avviso", 
+                        "pydexcom non è installato. Per usare Dexcom Share, installa la libreria:\n\n"
+                        "pip install pydexcom\n\n"
+                        "Oppure usa Nightscout come alternativa.")
+                    return
                 
-                with open(config_path, "w") as f:
-                    f.write(encrypted_config)
-                
-                # Aggiorna gli headers se necessario
-                if self.config.get("connection_type") == "Nightscout":
-                    self.headers = {
-                        'api-secret': self.config['api_secret_sha1'],
-                        'Content-Type': 'application/json'
-                    }
-                else:
-                    # Aggiorna il client Dexcom
-                    if not self.dexcom_client or not self.dexcom_client.is_available():
-                        QMessageBox.warning(self, "Avviso", 
-                            "pydexcom non è installato. Per usare Dexcom Share, installa la libreria:\n\n"
-                            "pip install pydexcom\n\n"
-                            "Oppure usa Nightscout come alternativa.")
-                        return
-                    
-                    self.dexcom_client = DexcomClient(
-                        username=self.config.get("dexcom_username", ""),
-                        password=self.config.get("dexcom_password", ""),
-                        region=self.config.get("dexcom_region", "ous")
-                    )
-                
-                # Ricarica i dati
-                self.fetch_glucose_data()
+                # Aggiorna worker e pianificatore e ricarica i dati
+                self.apply_config()
                 
                 QMessageBox.information(self, "Successo", "Configurazione salvata con successo!")
             except Exception as e:
                 QMessageBox.critical(self, "Errore", f"Errore nel salvare la configurazione: {str(e)}") 
 
+    def show_agp_report(self):
+        """Mostra il profilo glicemico ambulatoriale della cronologia locale"""
+        from .agp_dialog import AgpDialog
+        dialog = AgpDialog(self.history_store, self.config, self)
+        dialog.exec_()
+
     def show_help(self):
         """Mostra la finestra di aiuto"""
+        from .help_dialog import HelpDialog
         dialog = HelpDialog(self)
         dialog.exec_() 
 
@@ -768,4 +909,21 @@ class MainWindow(QMainWindow):
             self.hide()  # Nasconde la finestra invece di minimizzarla
         super().changeEvent(event) 
 
- 
\ No newline at end of file
+    def showEvent(self, event):
+        """Applica in un solo passaggio gli aggiornamenti arrivati mentre era nascosta"""
+        self.glucose_view.set_visible(True)
+        if self.stats_outdated:
+            self.schedule_stats_refresh()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        """Da nascosta la finestra aggiorna solo il system tray"""
+        self.glucose_view.set_visible(False)
+        super().hideEvent(event)
+
+ 
+
+    def paintEvent(self, event):
+        """Registra il primo disegno della finestra per il profilo di avvio"""
+        super().paintEvent(event)
+        profiler.end("first paint")
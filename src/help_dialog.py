@@ -4,15 +4,14 @@ Copyright (C) 2025 Emmanuele Pani
 """
 
 from PyQt5.QtWidgets import QDialog, QLabel, QVBoxLayout, QScrollArea, QWidget
-from PyQt5.QtGui import QIcon
 from PyQt5.QtCore import Qt
-from .resources import get_icon_path
+from .resources import get_icon
 
 class HelpDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Aiuto")
-        self.setWindowIcon(QIcon(get_icon_path()))
+        self.setWindowIcon(get_icon())
         self.setModal(True)
         self.resize(800, 600)
         
@@ -93,12 +92,15 @@ class HelpDialog(QDialog):
         delta_text = """
         <div style='color: white;'>
             <h3>Delta (Δ)</h3>
-            <p>Il delta mostra la variazione della glicemia rispetto alla lettura precedente:</p>
+            <p>Il delta mostra la variazione della glicemia rispetto alla lettura precedente, riportata a 5 minuti:</p>
             <ul>
             <li>Un valore positivo (+) indica un aumento</li>
             <li>Un valore negativo (-) indica una diminuzione</li>
             </ul>
             <p>Esempio: +5.0 mg/dL significa che la glicemia è aumentata di 5 mg/dL dall'ultima lettura</p>
+            <p>Accanto al delta è indicata la velocità di variazione degli ultimi 15 minuti (mg/dL/min).
+            Se tra due letture sono passati più di 15 minuti il delta non viene calcolato;
+            "(dati mancanti)" segnala che mancano una o più letture.</p>
         </div>
         """
         
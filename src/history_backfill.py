@@ -0,0 +1,143 @@
+"""
+Glik - A Nightscout desktop viewer
+Copyright (C) 2025 Emmanuele Pani
+
+Scaricamento in parallelo della cronologia Nightscout
+"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+from .nightscout_client import NightscoutClient
+from .history_store import source_id
+
+# Durata di un giorno in millisecondi
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+class HistoryBackfill(QObject):
+    """
+    Scarica la cronologia Nightscout a blocchi giornalieri
+
+    I blocchi sono allineati alla mezzanotte UTC, così restano identici
+    tra un avvio e l'altro: quelli già salvati vengono saltati e uno
+    scaricamento interrotto riprende da dove si era fermato. Il blocco del
+    giorno corrente non viene mai segnato come completo.
+    """
+
+    # Emesso con (blocchi completati, blocchi totali)
+    progress = pyqtSignal(int, int)
+    # Emesso al termine con il numero di letture nuove salvate
+    finished = pyqtSignal(int)
+
+    # Giorni di cronologia da scaricare
+    DAYS = 90
+    # Richieste contemporanee verso Nightscout
+    MAX_WORKERS = 4
+    # Letture richieste per pagina
+    PAGE_SIZE = 500
+
+    def __init__(self, config, history_store):
+        """
+        Args:
+            config: Configurazione con URL e API Secret di Nightscout
+            history_store: Archivio locale in cui salvare le letture
+        """
+        super().__init__()
+        self.config = dict(config)
+        self.history_store = history_store
+        # Blocchi e letture sono registrati per sito: cambiando sito si riparte da zero
+        self.source = source_id(self.config)
+        self._cancelled = threading.Event()
+        self._client = None
+
+    def cancel(self):
+        """Interrompe lo scaricamento (può essere chiamato da qualsiasi thread)"""
+        self._cancelled.set()
+        # Le richieste in corso vengono interrotte invece di attenderne la risposta
+        client = self._client
+        if client:
+            client.abort()
+
+    def pending_chunks(self, now_ms: int) -> list:
+        """Restituisce l'inizio dei blocchi da scaricare, dal più recente"""
+        today = now_ms - now_ms % DAY_MS
+        completed = self.history_store.completed_chunks(self.source)
+        chunks = [today - day * DAY_MS for day in range(self.DAYS + 1)]
+        return [start for start in chunks if start not in completed]
+
+    @pyqtSlot()
+    def run(self):
+        """Scarica i blocchi mancanti con parallelismo limitato"""
+        added = 0
+        client = NightscoutClient(
+            self.config.get("nightscout_url", ""),
+            self.config.get("api_secret_sha1", "")
+        )
+        self._client = client
+        if self._cancelled.is_set():
+            # Annullato prima che il client esistesse
+            client.abort()
+
+        try:
+            now_ms = int(time.time() * 1000)
+            today = now_ms - now_ms % DAY_MS
+            chunks = self.pending_chunks(now_ms)
+            total = len(chunks)
+            done = 0
+            self.progress.emit(done, total)
+
+            with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as pool:
+                futures = {
+                    pool.submit(self._fetch_chunk, client, start, min(start + DAY_MS, now_ms)): start
+                    for start in chunks
+                }
+                for future in as_completed(futures):
+                    if self._cancelled.is_set():
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        break
+
+                    start = futures[future]
+                    entries = future.result()
+                    if entries is not None:
+                        # Il giorno corrente è incompleto e va riscaricato al prossimo avvio
+                        added += self.history_store.add_chunk(
+                            start, self.source, entries, completed=start != today
+                        )
+
+                    done += 1
+                    self.progress.emit(done, total)
+
+        except Exception as e:
+            print(f"Errore nello scaricamento della cronologia: {str(e)}")
+
+        finally:
+            self._client = None
+            client.close()
+            self.finished.emit(added)
+
+    def _fetch_chunk(self, client, start, end):
+        """
+        Scarica un blocco paginando dal più recente al più vecchio
+
+        Returns:
+            Lista di letture del blocco o None se errore
+        """
+        entries = []
+        while not self._cancelled.is_set():
+            page = client.get_entries_between(start, end, self.PAGE_SIZE)
+            if page is None:
+                return None
+
+            entries.extend(page)
+            if len(page) < self.PAGE_SIZE:
+                return entries
+
+            # Pagina piena: continua dalle letture più vecchie di quella ricevuta
+            oldest = min(entry.get("date", end) for entry in page)
+            if oldest >= end:
+                return entries
+            end = oldest
+        return None
@@ -0,0 +1,264 @@
+"""
+Glik - A Nightscout desktop viewer
+Copyright (C) 2025 Emmanuele Pani
+
+Archivio locale persistente della cronologia glicemica
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Iterable
+
+from .readings import reading_timestamp
+from .resources import get_app_data_dir
+
+
+def source_id(config: Dict[str, Any]) -> str:
+    """
+    Restituisce l'identificativo della sorgente dei dati della configurazione
+
+    Comprende il sito Nightscout o l'account Dexcom, così cambiando sito
+    o account non si riprendono le letture (né il punto di ripresa della
+    sincronizzazione) di quello precedente.
+
+    Returns:
+        'nightscout:<url>' oppure 'dexcom:<regione>:<username>'
+    """
+    if config.get("connection_type") == "Dexcom Share":
+        region = config.get("dexcom_region", "ous").strip().lower()
+        username = config.get("dexcom_username", "").strip().lower()
+        return f"dexcom:{region}:{username}"
+    url = config.get("nightscout_url", "").strip().rstrip("/").lower()
+    return f"nightscout:{url}"
+
+
+class HistoryStore:
+    """
+    Archivio SQLite delle letture glicemiche
+
+    Le letture sono indicizzate per sorgente e timestamp (millisecondi
+    epoch), che insieme formano la chiave primaria: gli inserimenti
+    duplicati vengono ignorati e ogni interrogazione riguarda una sola
+    sorgente, così i dati di sorgenti diverse non si mescolano. Il
+    database usa il journal WAL, così le letture dalla GUI non bloccano
+    le scritture del worker.
+    """
+
+    # Versione dello schema (PRAGMA user_version), per le migrazioni future
+    SCHEMA_VERSION = 1
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Apre (o crea) l'archivio
+
+        Args:
+            path: Percorso del database, di default history.db nella
+                directory dati dell'applicazione
+        """
+        self.path = path or os.path.join(get_app_data_dir(), "history.db")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        """Crea le tabelle se non esistono"""
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS readings (
+                    source TEXT NOT NULL,
+                    date INTEGER NOT NULL,
+                    sgv INTEGER NOT NULL,
+                    direction TEXT,
+                    PRIMARY KEY (source, date)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS backfill_chunks (
+                    start INTEGER NOT NULL,
+                    source TEXT NOT NULL,
+                    PRIMARY KEY (start, source)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            """)
+            self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    @staticmethod
+    def _to_row(entry: Dict[str, Any], source: str) -> Optional[tuple]:
+        """Converte una lettura in una riga del database"""
+        timestamp = reading_timestamp(entry)
+        sgv = entry.get("sgv")
+        if timestamp is None or not isinstance(sgv, (int, float)):
+            return None
+        return (source, int(round(timestamp * 1000)), int(sgv), entry.get("direction"))
+
+    @staticmethod
+    def _to_entry(row: tuple) -> Dict[str, Any]:
+        """Converte una riga del database in una lettura in formato Nightscout"""
+        date, sgv, direction = row
+        return {
+            "date": date,
+            "sgv": sgv,
+            "direction": direction or "",
+            "dateString": datetime.fromtimestamp(date / 1000.0, tz=timezone.utc).isoformat()
+        }
+
+    def add_readings(self, entries: Iterable[Dict[str, Any]], source: str) -> int:
+        """
+        Salva un gruppo di letture in un'unica transazione
+
+        Args:
+            entries: Letture in formato Nightscout
+            source: Sorgente dei dati (vedi source_id)
+
+        Returns:
+            Numero di letture nuove effettivamente salvate
+        """
+        rows = [row for row in (self._to_row(entry, source) for entry in entries) if row]
+        if not rows:
+            return 0
+
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO readings (source, date, sgv, direction) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            return self._conn.total_changes - before
+
+    def _latest_row(self, source: str) -> Optional[tuple]:
+        """Restituisce la riga più recente della sorgente"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT date, sgv, direction FROM readings WHERE source = ? ORDER BY date DESC LIMIT 1",
+                (source,)
+            ).fetchone()
+
+    def latest_date(self, source: str) -> Optional[int]:
+        """Restituisce il timestamp (ms) della lettura più recente della sorgente"""
+        row = self._latest_row(source)
+        return row[0] if row else None
+
+    def latest(self, source: str) -> Optional[Dict[str, Any]]:
+        """Restituisce la lettura più recente della sorgente"""
+        row = self._latest_row(source)
+        return self._to_entry(row) if row else None
+
+    def get_range(self, source: str, start: int, end: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Restituisce le letture in un intervallo di tempo, in ordine cronologico
+
+        Args:
+            source: Sorgente dei dati
+            start: Inizio dell'intervallo (ms epoch, incluso)
+            end: Fine dell'intervallo (ms epoch, escluso), di default nessun limite
+
+        Returns:
+            Lista di letture in formato Nightscout
+        """
+        with self._lock:
+            if end is None:
+                rows = self._conn.execute(
+                    "SELECT date, sgv, direction FROM readings WHERE source = ? AND date >= ? ORDER BY date",
+                    (source, start)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT date, sgv, direction FROM readings "
+                    "WHERE source = ? AND date >= ? AND date < ? ORDER BY date",
+                    (source, start, end)
+                ).fetchall()
+        return [self._to_entry(row) for row in rows]
+
+    def get_arrays(self, source: str, start: int, end: Optional[int] = None):
+        """
+        Restituisce le letture di un intervallo come array NumPy, in ordine cronologico
+
+        Evita di costruire un dizionario per lettura: è il formato usato
+        dai calcoli statistici sull'intera cronologia.
+
+        Args:
+            source: Sorgente dei dati
+            start: Inizio dell'intervallo (ms epoch, incluso)
+            end: Fine dell'intervallo (ms epoch, escluso), di default nessun limite
+
+        Returns:
+            Tupla (istanti in secondi epoch, valori in mg/dL)
+        """
+        import numpy as np
+
+        with self._lock:
+            if end is None:
+                rows = self._conn.execute(
+                    "SELECT date, sgv FROM readings WHERE source = ? AND date >= ? ORDER BY date",
+                    (source, start)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT date, sgv FROM readings WHERE source = ? AND date >= ? AND date < ? ORDER BY date",
+                    (source, start, end)
+                ).fetchall()
+        data = np.array(rows, dtype=np.float64).reshape(-1, 2)
+        return data[:, 0] / 1000.0, data[:, 1]
+
+    def completed_chunks(self, source: str) -> set:
+        """Restituisce l'inizio (ms epoch) dei blocchi di cronologia già scaricati"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT start FROM backfill_chunks WHERE source = ?",
+                (source,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def add_chunk(self, start: int, source: str, entries: Iterable[Dict[str, Any]], completed: bool = True) -> int:
+        """
+        Salva le letture di un blocco di cronologia e lo segna come scaricato
+
+        Args:
+            start: Inizio del blocco (ms epoch)
+            source: Sorgente dei dati
+            entries: Letture del blocco
+            completed: Se False il blocco verrà riscaricato in futuro
+
+        Returns:
+            Numero di letture nuove effettivamente salvate
+        """
+        rows = [row for row in (self._to_row(entry, source) for entry in entries) if row]
+
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO readings (source, date, sgv, direction) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            added = self._conn.total_changes - before
+            if completed:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO backfill_chunks (start, source) VALUES (?, ?)",
+                    (start, source)
+                )
+            return added
+
+    def get_meta(self, key: str) -> Optional[str]:
+        """Restituisce un valore salvato nella tabella chiave/valore"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        """Salva un valore nella tabella chiave/valore (es. stato dei modelli)"""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def close(self):
+        """Chiude il database"""
+        with self._lock:
+            self._conn.close()
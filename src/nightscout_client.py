@@ -0,0 +1,271 @@
+"""
+Glik - A Nightscout desktop viewer
+Copyright (C) 2025 Emmanuele Pani
+
+Client per la connessione alle API di Nightscout
+"""
+
+import socket
+import weakref
+from typing import Optional, Dict, Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+
+class RequestAborted(Exception):
+    """
+    Richiesta interrotta con NightscoutClient.abort()
+
+    Non deriva da OSError, così urllib3 non la tratta come un errore di
+    rete da ritentare.
+    """
+
+
+class _AbortableAdapter(HTTPAdapter):
+    """HTTPAdapter che tiene traccia delle proprie connessioni per poterle interrompere"""
+
+    def __init__(self, *args, **kwargs):
+        # Impostati prima di super().__init__, che crea il pool manager
+        self.connections = weakref.WeakSet()
+        self.aborted = False
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": self._tracking_pool(HTTPConnectionPool),
+            "https": self._tracking_pool(HTTPSConnectionPool),
+        }
+
+    def _tracking_pool(self, pool_class):
+        """Pool che registra ogni nuova connessione e non ne apre dopo abort()"""
+        adapter = self
+
+        class TrackingPool(pool_class):
+            def _new_conn(self):
+                if adapter.aborted:
+                    raise RequestAborted("Richiesta interrotta")
+                connection = super()._new_conn()
+                adapter.connections.add(connection)
+                return connection
+
+        return TrackingPool
+
+    def abort(self):
+        """Chiude i socket aperti: le letture in corso terminano subito con un errore"""
+        self.aborted = True
+        for connection in list(self.connections):
+            sock = getattr(connection, "sock", None)
+            if sock is None:
+                continue
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class NightscoutClient:
+    """Client per la connessione alle API di Nightscout"""
+
+    # Timeout (secondi) per connessione e lettura della risposta
+    CONNECT_TIMEOUT = 5
+    READ_TIMEOUT = 15
+    # Numero massimo di letture recuperate in una sincronizzazione (7 giorni)
+    SYNC_MAX_COUNT = 2016
+
+    def __init__(self, url: str = "", api_secret_sha1: str = ""):
+        """
+        Inizializza il client Nightscout
+
+        Args:
+            url: URL del sito Nightscout
+            api_secret_sha1: Hash SHA1 dell'API Secret
+        """
+        self.url = url.strip().rstrip("/")
+        self.api_secret_sha1 = api_secret_sha1
+        self.last_error = None
+        # Validatori (ETag, Last-Modified) dell'ultima richiesta di letture
+        self._validators = None
+        self.session = self._create_session()
+
+    def _create_session(self) -> requests.Session:
+        """Crea una sessione HTTP persistente con pool di connessioni e retry"""
+        session = requests.Session()
+
+        # Ritenta solo gli errori di connessione e i 5xx transitori, con attesa
+        # crescente: un timeout di lettura non si ritenta, perché ogni tentativo
+        # bloccherebbe il worker per un altro timeout intero e il polling
+        # successivo riproverà comunque
+        retry = Retry(
+            total=3,
+            connect=3,
+            read=0,
+            backoff_factor=0.5,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False
+        )
+        self._adapter = _AbortableAdapter(pool_connections=1, pool_maxsize=4, max_retries=retry)
+        session.mount("https://", self._adapter)
+        session.mount("http://", self._adapter)
+
+        # Headers costruiti una sola volta e riusati per ogni richiesta
+        session.headers.update({
+            'api-secret': self.api_secret_sha1,
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate'
+        })
+        return session
+
+    def _get(self, path: str, params: Optional[Dict[str, Any]] = None,
+             headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """Esegue una GET sul sito Nightscout riusando la sessione"""
+        if self._adapter.aborted:
+            raise RequestAborted("Richiesta interrotta")
+        response = self.session.get(
+            f"{self.url}{path}",
+            params=params,
+            headers=headers,
+            timeout=(self.CONNECT_TIMEOUT, self.READ_TIMEOUT)
+        )
+        response.raise_for_status()
+        return response
+
+    def get_entries(self, count: int = 1) -> Optional[list]:
+        """
+        Ottiene le ultime letture glicemiche
+
+        Args:
+            count: Numero di letture da recuperare
+
+        Returns:
+            Lista di letture (più recente per prima) o None se errore
+        """
+        return self._get_entries({
+            'count': count,
+            'find[type]': 'sgv'
+        })
+
+    def get_entries_since(self, last_date: int) -> Optional[list]:
+        """
+        Ottiene solo le letture successive all'ultima già salvata
+
+        Dopo una sospensione o un'interruzione di rete una sola richiesta
+        recupera tutte le letture mancanti (fino a SYNC_MAX_COUNT).
+
+        Args:
+            last_date: Timestamp (ms epoch) dell'ultima lettura salvata
+
+        Returns:
+            Lista di letture nuove (più recente per prima), vuota se non ce
+            ne sono, o None se errore
+        """
+        return self._get_entries({
+            'count': self.SYNC_MAX_COUNT,
+            'find[type]': 'sgv',
+            'find[date][$gt]': last_date
+        })
+
+    def get_entries_between(self, start: int, end: int, count: int) -> Optional[list]:
+        """
+        Ottiene le letture in un intervallo di tempo
+
+        Args:
+            start: Inizio dell'intervallo (ms epoch, incluso)
+            end: Fine dell'intervallo (ms epoch, escluso)
+            count: Numero massimo di letture da recuperare
+
+        Returns:
+            Lista di letture (più recente per prima) o None se errore
+        """
+        return self._get_entries({
+            'count': count,
+            'find[type]': 'sgv',
+            'find[date][$gte]': start,
+            'find[date][$lt]': end
+        })
+
+    def _conditional_headers(self, key: tuple) -> Dict[str, str]:
+        """Costruisce gli headers condizionali se la richiesta è già stata fatta"""
+        if not self._validators or self._validators[0] != key:
+            return {}
+        _, etag, last_modified = self._validators
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def _get_entries(self, params: Dict[str, Any]) -> Optional[list]:
+        """
+        Richiede le letture all'endpoint entries.json
+
+        Se la stessa richiesta è già stata fatta invia If-None-Match e
+        If-Modified-Since: con una risposta 304 il corpo non viene
+        scaricato né interpretato e si restituisce una lista vuota.
+        """
+        if not self.url:
+            self.last_error = "URL Nightscout non configurato"
+            return None
+
+        try:
+            key = tuple(sorted(params.items()))
+            response = self._get("/api/v1/entries.json", params, self._conditional_headers(key))
+            self.last_error = None
+
+            if response.status_code == 304:
+                # Nessuna novità rispetto alla richiesta precedente
+                return []
+
+            entries = response.json()
+            self._validators = (key, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            return entries
+
+        except requests.Timeout:
+            self.last_error = "Timeout nella connessione a Nightscout"
+        except requests.ConnectionError as e:
+            self.last_error = f"Problema di connessione: {e}"
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 401:
+                self.last_error = "API Secret non valido"
+            else:
+                self.last_error = f"Errore Nightscout: {e}"
+        except ValueError as e:
+            self.last_error = f"Risposta Nightscout non valida: {e}"
+        except RequestAborted:
+            # Chiusura in corso: non è un errore da segnalare
+            self.last_error = "Richiesta interrotta"
+            return None
+
+        if self._adapter.aborted:
+            # Errore causato dalla connessione chiusa da abort()
+            self.last_error = "Richiesta interrotta"
+            return None
+
+        print(f"Errore Nightscout: {self.last_error}")
+        return None
+
+    def update_credentials(self, url: str, api_secret_sha1: str):
+        """Aggiorna URL e API Secret mantenendo il pool di connessioni"""
+        self.url = url.strip().rstrip("/")
+        self.api_secret_sha1 = api_secret_sha1
+        self.session.headers['api-secret'] = api_secret_sha1
+        self._validators = None
+
+    def abort(self):
+        """
+        Interrompe le richieste in corso e rifiuta quelle successive
+
+        Può essere chiamato da qualsiasi thread, anche mentre un altro
+        thread è bloccato in attesa della risposta: serve a fermare
+        rapidamente i worker all'uscita.
+        """
+        self._adapter.abort()
+
+    def close(self):
+        """Chiude le connessioni aperte"""
+        self.session.close()
@@ -0,0 +1,165 @@
+"""
+Glik - A Nightscout desktop viewer
+Copyright (C) 2025 Emmanuele Pani
+
+Aggiornamenti in tempo reale tramite il canale socket di Nightscout
+"""
+
+import threading
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+try:
+    import socketio
+    SOCKETIO_AVAILABLE = True
+except ImportError:
+    SOCKETIO_AVAILABLE = False
+
+
+def to_entry(sgv: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Converte una lettura del canale socket nel formato di entries.json"""
+    mills = sgv.get("mills")
+    value = sgv.get("mgdl", sgv.get("sgv"))
+    if not isinstance(mills, (int, float)) or not isinstance(value, (int, float)):
+        return None
+    return {
+        "date": int(mills),
+        "sgv": value,
+        "direction": sgv.get("direction", ""),
+        "dateString": datetime.fromtimestamp(mills / 1000.0, tz=timezone.utc).isoformat()
+    }
+
+
+class NightscoutStream(QObject):
+    """
+    Sottoscrizione agli eventi 'dataUpdate' di Nightscout
+
+    La connessione gira in un thread in background e viene ristabilita
+    dal suo ciclo di tentativi con backoff (la riconnessione automatica di
+    python-socketio è disattivata, così stop() ha sempre effetto); i
+    segnali 'connected' e 'disconnected' permettono alla GUI di sospendere
+    e riprendere il polling. Dopo stop() non viene emesso alcun segnale.
+    """
+
+    # Emesso con le nuove letture (lista in formato entries.json)
+    entries_received = pyqtSignal(list)
+    # Emesso quando il canale è connesso e autorizzato
+    connected = pyqtSignal()
+    # Emesso quando il canale si interrompe
+    disconnected = pyqtSignal()
+
+    # Attesa massima (secondi) tra due tentativi di connessione
+    MAX_RETRY_DELAY = 60
+
+    def __init__(self, url: str, api_secret_sha1: str, parent=None):
+        """
+        Args:
+            url: URL del sito Nightscout (o di un server di prova locale)
+            api_secret_sha1: Hash SHA1 dell'API Secret
+        """
+        super().__init__(parent)
+        self.url = url.strip().rstrip("/")
+        self.api_secret_sha1 = api_secret_sha1
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._sio = None
+
+    @staticmethod
+    def is_available() -> bool:
+        """Verifica se python-socketio è disponibile"""
+        return SOCKETIO_AVAILABLE
+
+    def start(self):
+        """Avvia la connessione in un thread in background"""
+        if not SOCKETIO_AVAILABLE:
+            self.last_error = "python-socketio non disponibile"
+            print("python-socketio non disponibile. Installa con: pip install \"python-socketio[client]\"")
+            return
+
+        self._stop.clear()
+        self._sio = socketio.Client(reconnection=False)
+        self._sio.on("connect", self._on_connect)
+        self._sio.on("disconnect", self._on_disconnect)
+        self._sio.on("dataUpdate", self._on_data_update)
+
+        self._thread = threading.Thread(target=self._run, name="NightscoutStream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Chiude la connessione (il thread termina appena esce da connect)"""
+        self._stop.set()
+        if self._sio:
+            try:
+                self._sio.disconnect()
+            except Exception as e:
+                print(f"Errore nella chiusura del canale Nightscout: {e}")
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        """Mantiene la connessione attiva finché non viene fermata"""
+        delay = 1
+        while not self._stop.is_set():
+            try:
+                self._sio.connect(self.url, transports=["websocket"], wait_timeout=10)
+                if self._stop.is_set():
+                    # stop() è stato chiamato durante la connessione
+                    self._sio.disconnect()
+                    break
+                delay = 1
+                # Attende finché la connessione non termina
+                self._sio.wait()
+            except Exception as e:
+                self.last_error = f"Canale Nightscout non disponibile: {e}"
+                print(self.last_error)
+                self._emit("disconnected")
+
+            if self._stop.wait(delay):
+                break
+            delay = min(delay * 2, self.MAX_RETRY_DELAY)
+
+    def _emit(self, name, *args):
+        """
+        Emette un segnale solo se il canale non è stato fermato
+
+        Dopo stop() l'oggetto può essere già stato distrutto dalla GUI:
+        il segnale viene cercato per nome solo dopo il controllo.
+        """
+        if not self._stop.is_set():
+            getattr(self, name).emit(*args)
+
+    def _on_connect(self):
+        """Richiede l'autorizzazione alla lettura dei dati"""
+        self._sio.emit("authorize", {
+            "client": "web",
+            "secret": self.api_secret_sha1,
+            "history": 1
+        }, callback=self._on_authorized)
+
+    def _on_authorized(self, data=None):
+        """Gestisce la risposta all'autorizzazione"""
+        if isinstance(data, dict) and not data.get("read", True):
+            self.last_error = "API Secret non autorizzato alla lettura"
+            print(self.last_error)
+            self._emit("disconnected")
+            return
+        self.last_error = None
+        self._emit("connected")
+
+    def _on_disconnect(self, *args):
+        """Segnala l'interruzione del canale"""
+        self._emit("disconnected")
+
+    def _on_data_update(self, data):
+        """Inoltra le nuove letture ricevute dal server"""
+        if not isinstance(data, dict):
+            return
+        entries = [entry for entry in (to_entry(sgv) for sgv in data.get("sgvs") or []) if entry]
+        if entries:
+            # Più recente per prima, come in entries.json
+            entries.sort(key=lambda entry: entry["date"], reverse=True)
+            self._emit("entries_received", entries)
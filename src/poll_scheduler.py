@@ -0,0 +1,191 @@
+"""
+Glik - A Nightscout desktop viewer
+Copyright (C) 2025 Emmanuele Pani
+
+Pianificatore delle richieste basato sull'arrivo previsto delle letture
+"""
+
+import time
+import statistics
+from collections import deque
+from typing import Optional
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from .failure_policy import CircuitBreaker
+from .readings import READING_INTERVAL
+
+
+class PollScheduler(QObject):
+    """
+    Pianifica le richieste in base alla prossima lettura prevista
+
+    Il CGM produce una lettura ogni 5 minuti: dopo ogni lettura il
+    pianificatore attende fino a poco dopo la successiva e poi interroga
+    la sorgente a cadenza ravvicinata finché non arriva. Se l'orario non
+    è prevedibile (nessuna lettura) usa l'intervallo configurato.
+
+    Le letture arrivano alla sorgente con un ritardo di caricamento (spesso
+    alcuni minuti con Dexcom Share): il pianificatore misura per ogni
+    sorgente il ritardo con cui arrivano le letture nuove e sposta in
+    avanti della sua mediana la finestra a cadenza ravvicinata. Finché il
+    ritardo non è noto, una lettura non arrivata entro la finestra viene
+    cercata con l'intervallo configurato invece di attendere lo slot
+    successivo, così anche la misura del ritardo resta precisa.
+
+    Gli errori di ogni sorgente sono gestiti da un CircuitBreaker: le
+    richieste successive a un errore vengono ritardate con backoff
+    esponenziale e sospese del tutto quando il circuito è aperto.
+    """
+
+    # Emesso quando è il momento di richiedere nuovi dati
+    poll = pyqtSignal()
+
+    # Attesa dopo l'orario previsto prima della prima richiesta (secondi)
+    GRACE_PERIOD = 15
+    # Cadenza delle richieste mentre la lettura è attesa (secondi)
+    FAST_INTERVAL = 10
+    # Durata della finestra a cadenza ravvicinata (secondi)
+    FAST_WINDOW = 120
+    # Intervallo di controllo mentre il canale in tempo reale è attivo (secondi)
+    STREAMING_INTERVAL = 300
+    # Ritardi di arrivo considerati per la stima
+    LATENCY_SAMPLES = 12
+    # Ritardo massimo (secondi) considerato; oltre è un recupero dopo un'interruzione
+    MAX_LATENCY = READING_INTERVAL
+
+    def __init__(self, fallback_interval: int = 30, parent=None):
+        """
+        Args:
+            fallback_interval: Intervallo (secondi) usato quando non è
+                possibile prevedere la prossima lettura
+        """
+        super().__init__(parent)
+        self.fallback_interval = fallback_interval
+        self.last_reading_time = None
+        self.streaming = False
+        self.source = None
+        self.breakers = {}
+        self.latencies = {}
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._on_timeout)
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        """Politica di errore della sorgente corrente"""
+        return self.breakers.setdefault(self.source, CircuitBreaker())
+
+    @property
+    def latency(self) -> float:
+        """Mediana (secondi) del ritardo di arrivo delle letture della sorgente corrente"""
+        samples = self.latencies.get(self.source)
+        return statistics.median(samples) if samples else 0.0
+
+    def set_source(self, source: str):
+        """Imposta la sorgente corrente, azzerandone gli errori (es. nuove credenziali)"""
+        self.source = source
+        self.breaker.reset()
+
+    def fetch_succeeded(self):
+        """Registra una richiesta riuscita"""
+        self.breaker.record_success()
+
+    def fetch_failed(self):
+        """Registra una richiesta fallita"""
+        self.breaker.record_failure(time.time())
+
+    def _on_timeout(self):
+        """Richiede i dati se la sorgente non è sospesa dal circuit breaker"""
+        if self.breaker.allow_request(time.time()):
+            self.poll.emit()
+        else:
+            self.schedule_next()
+
+    def set_fallback_interval(self, seconds: int):
+        """Aggiorna l'intervallo di ripiego"""
+        self.fallback_interval = seconds
+
+    def set_streaming(self, streaming: bool):
+        """
+        Attiva o disattiva la modalità push
+
+        Con il canale in tempo reale attivo resta solo un controllo di
+        sicurezza; quando cade si torna subito al polling.
+        """
+        if streaming == self.streaming:
+            return
+        self.streaming = streaming
+        if self.timer.isActive():
+            self.schedule_next(None if streaming else 1)
+
+    def reading_received(self, timestamp: Optional[float], now: Optional[float] = None):
+        """
+        Registra l'istante (secondi epoch) dell'ultima lettura ricevuta
+
+        Per le letture nuove misura anche il ritardo di arrivo (istante di
+        ricezione meno istante della lettura); la prima lettura non conta,
+        perché può essere quella salvata prima dell'avvio.
+        """
+        if timestamp is None:
+            return
+        if self.last_reading_time is None:
+            self.last_reading_time = timestamp
+        elif timestamp > self.last_reading_time:
+            self.last_reading_time = timestamp
+            latency = (time.time() if now is None else now) - timestamp
+            if 0 <= latency <= self.MAX_LATENCY:
+                self.latencies.setdefault(
+                    self.source, deque(maxlen=self.LATENCY_SAMPLES)
+                ).append(latency)
+
+    def schedule_next(self, delay: Optional[float] = None):
+        """Pianifica la prossima richiesta, calcolando l'attesa se non indicata"""
+        if delay is None:
+            delay = self.next_delay(time.time())
+        self.timer.start(int(max(delay, 1) * 1000))
+
+    def stop(self):
+        """Ferma il pianificatore"""
+        self.timer.stop()
+
+    def next_delay(self, now: float) -> float:
+        """
+        Calcola l'attesa (secondi) fino alla prossima richiesta
+
+        Args:
+            now: Istante corrente in secondi epoch
+
+        Returns:
+            Secondi da attendere
+        """
+        if self.streaming:
+            return self.STREAMING_INTERVAL
+
+        # Dopo un errore attendi secondo il backoff della sorgente
+        if self.breaker.failures:
+            return self.breaker.retry_delay(now)
+
+        if self.last_reading_time is None:
+            return self.fallback_interval
+
+        # La finestra si apre poco prima dell'arrivo previsto: un intervallo
+        # ravvicinato prima del ritardo mediano, mai prima del periodo di grazia
+        offset = max(self.GRACE_PERIOD, self.latency - self.FAST_INTERVAL)
+
+        # Le letture mantengono la fase di 5 minuti anche se alcune mancano:
+        # cerca il primo slot la cui finestra di attesa non è ancora chiusa
+        elapsed = max(now - self.last_reading_time, 0)
+        slots = max(int((elapsed - offset - self.FAST_WINDOW) // READING_INTERVAL) + 1, 1)
+        window_start = self.last_reading_time + slots * READING_INTERVAL + offset
+
+        if now < window_start:
+            overdue = now - self.last_reading_time - READING_INTERVAL
+            if slots > 1 and overdue <= self.MAX_LATENCY:
+                # Finestra chiusa senza la lettura attesa: caricamento più lento del previsto
+                return min(window_start - now, self.fallback_interval)
+            # Dormi fino a poco dopo la lettura prevista
+            return window_start - now
+
+        # Lettura in ritardo: interroga a cadenza ravvicinata
+        return min(self.FAST_INTERVAL, self.fallback_interval)
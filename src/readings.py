@@ -0,0 +1,35 @@
+"""
+Glik - A Nightscout desktop viewer
+Copyright (C) 2025 Emmanuele Pani
+
+Funzioni di utilità per le letture glicemiche
+"""
+
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+# Intervallo tra due letture consecutive di un CGM (secondi)
+READING_INTERVAL = 300
+
+# Età oltre la quale una lettura viene mostrata come non aggiornata (secondi)
+STALE_AFTER = 2 * READING_INTERVAL
+
+
+def reading_timestamp(entry: Dict[str, Any]) -> Optional[float]:
+    """
+    Restituisce l'istante della lettura in secondi epoch
+
+    Usa il campo 'date' (millisecondi) di Nightscout se presente,
+    altrimenti interpreta 'dateString' in formato ISO.
+    """
+    date = entry.get("date")
+    if isinstance(date, (int, float)) and date > 0:
+        return date / 1000.0
+
+    date_string = entry.get("dateString", "")
+    if not date_string:
+        return None
+    try:
+        return datetime.fromisoformat(date_string.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
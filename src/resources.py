@@ -5,7 +5,12 @@ Copyright (C) 2025 Emmanuele Pani
 
 import os
 import sys
+from functools import lru_cache
 
+# I percorsi vengono risolti alla prima richiesta e poi riusati: evita di
+# ripetere le verifiche sul filesystem ad ogni finestra aperta
+
+@lru_cache(maxsize=None)
 def get_resource_path(relative_path):
     """Ottiene il percorso assoluto per le risorse"""
     try:
@@ -30,6 +35,7 @@ def get_resource_path(relative_path):
     
     return os.path.join(base_path, relative_path)
 
+@lru_cache(maxsize=None)
 def get_logo_path():
     """Restituisce il percorso del logo PNG per la GUI"""
     paths = [
@@ -58,6 +64,7 @@ def get_logo_path():
             
     return get_resource_path(paths[0])  # Ultimo tentativo con il primo percorso
 
+@lru_cache(maxsize=None)
 def get_icon_path():
     """Restituisce il percorso dell'icona"""
     paths = [
@@ -73,4 +80,34 @@ def get_icon_path():
             return full_path
             
     # Ritorna il primo percorso come fallback
-    return get_resource_path(paths[0]) 
\ No newline at end of file
+    return get_resource_path(paths[0])
+
+@lru_cache(maxsize=None)
+def get_app_data_dir():
+    """Restituisce la directory dei dati dell'applicazione, creandola se necessario"""
+    # Su Windows usa APPDATA, altrove la directory di configurazione XDG
+    base_dir = os.getenv('APPDATA') or os.getenv('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser("~"), ".config")
+    app_dir = os.path.join(base_dir, 'Glik')
+    os.makedirs(app_dir, exist_ok=True)
+    return app_dir
+
+# Immagini decodificate una sola volta e condivise da tutte le finestre
+
+@lru_cache(maxsize=None)
+def get_icon():
+    """Restituisce l'icona delle finestre (QIcon)"""
+    from PyQt5.QtGui import QIcon
+    return QIcon(get_icon_path())
+
+@lru_cache(maxsize=None)
+def get_logo_icon():
+    """Restituisce il logo come icona dell'applicazione (QIcon)"""
+    from PyQt5.QtGui import QIcon
+    return QIcon(get_logo_path())
+
+@lru_cache(maxsize=None)
+def get_logo_pixmap(size: int = 128):
+    """Restituisce il logo ridimensionato al lato indicato (QPixmap)"""
+    from PyQt5.QtGui import QPixmap
+    from PyQt5.QtCore import Qt
+    return QPixmap(get_logo_path()).scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
@@ -0,0 +1,118 @@
+"""
+Glik - A Nightscout desktop viewer
+Copyright (C) 2025 Emmanuele Pani
+
+Delta e velocità di variazione su una finestra scorrevole di letture
+"""
+
+from collections import deque
+from typing import Optional, Dict, Any
+
+from .readings import READING_INTERVAL
+
+
+class RollingDelta:
+    """
+    Calcola delta, pendenza e buchi nei dati man mano che arrivano le letture
+
+    Conserva in un buffer circolare solo le letture degli ultimi 15
+    minuti, quindi ogni aggiornamento costa un tempo costante. Il delta
+    è riportato a 5 minuti anche quando tra due letture passa più tempo,
+    così un buco nei dati non gonfia il valore mostrato, ed è calcolato
+    rispetto a una lettura di almeno 2 minuti prima.
+    """
+
+    # Finestra (secondi) su cui calcolare la pendenza
+    WINDOW = 15 * 60
+    # Tolleranza (secondi) sull'orario delle letture all'interno della finestra
+    JITTER = 30
+    # Oltre questa distanza (secondi) tra due letture il delta non è significativo
+    MAX_DELTA_GAP = 15 * 60
+    # Distanza minima (secondi) dalla lettura di confronto per il delta: letture
+    # più ravvicinate (es. un ricalcolo dello stesso sensore) lo farebbero esplodere
+    MIN_DELTA_SPACING = 2 * 60
+    # Distanza (secondi) tra due letture oltre la quale si segnala un buco
+    GAP_THRESHOLD = 1.5 * READING_INTERVAL
+    # Letture minime per stimare la pendenza
+    MIN_SLOPE_READINGS = 3
+
+    def __init__(self):
+        # Al più una lettura ogni minuto nella finestra, con margine
+        self.readings = deque(maxlen=self.WINDOW // 60 + 2)
+        self.reset()
+
+    def reset(self):
+        """Svuota la finestra"""
+        self.readings.clear()
+        self.delta = None
+        self.slope = None
+        self.gap = False
+
+    def is_empty(self) -> bool:
+        """True se non è ancora stata ricevuta alcuna lettura"""
+        return not self.readings
+
+    def update(self, timestamp: float, value: float) -> bool:
+        """
+        Aggiunge una lettura alla finestra e aggiorna delta e pendenza
+
+        Args:
+            timestamp: Istante della lettura (secondi epoch)
+            value: Valore glicemico (mg/dL)
+
+        Returns:
+            True se la lettura è stata usata (False se non più recente dell'ultima)
+        """
+        if self.readings and timestamp <= self.readings[-1][0]:
+            return False
+
+        previous = self.readings[-1] if self.readings else None
+        self.readings.append((timestamp, float(value)))
+
+        # Scarta le letture uscite dalla finestra
+        while self.readings[0][0] < timestamp - self.WINDOW - self.JITTER:
+            self.readings.popleft()
+
+        # Delta riportato a 5 minuti
+        self.delta = None
+        self.gap = False
+        if previous is not None:
+            self.gap = timestamp - previous[0] > self.GAP_THRESHOLD
+            base = self._delta_base(timestamp)
+            if base is not None:
+                elapsed = timestamp - base[0]
+                if elapsed <= self.MAX_DELTA_GAP:
+                    self.delta = (value - base[1]) * READING_INTERVAL / elapsed
+
+        self.slope = self._fit_slope()
+        return True
+
+    def _delta_base(self, timestamp: float):
+        """Lettura più recente distante almeno MIN_DELTA_SPACING da timestamp"""
+        for reading in reversed(self.readings):
+            if timestamp - reading[0] >= self.MIN_DELTA_SPACING:
+                return reading
+        return None
+
+    def _fit_slope(self) -> Optional[float]:
+        """Pendenza (mg/dL al minuto) ai minimi quadrati delle letture nella finestra"""
+        count = len(self.readings)
+        if count < self.MIN_SLOPE_READINGS:
+            return None
+
+        origin = self.readings[-1][0]
+        mean_t = sum(t - origin for t, _ in self.readings) / count
+        mean_v = sum(v for _, v in self.readings) / count
+        covariance = sum((t - origin - mean_t) * (v - mean_v) for t, v in self.readings)
+        variance = sum((t - origin - mean_t) ** 2 for t, _ in self.readings)
+        if variance == 0:
+            return None
+        return covariance / variance * 60
+
+    def result(self) -> Dict[str, Any]:
+        """Valori da allegare alla lettura più recente"""
+        return {
+            "delta": self.delta,
+            "slope": self.slope,
+            "gap": self.gap,
+        }
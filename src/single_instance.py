@@ -0,0 +1,117 @@
+"""
+Glik - A Nightscout desktop viewer
+Copyright (C) 2025 Emmanuele Pani
+
+Istanza unica dell'applicazione tramite socket locale
+"""
+
+import getpass
+
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtNetwork import QAbstractSocket, QLocalServer, QLocalSocket
+
+# Comandi accettati dall'istanza in esecuzione
+SHOW_COMMAND = "show"
+REFRESH_COMMAND = "refresh"
+
+
+class SingleInstance(QObject):
+    """
+    Garantisce che per ogni utente sia in esecuzione una sola istanza
+
+    La prima istanza apre un server locale; le successive vi si collegano,
+    inviano i propri comandi (es. mostra la finestra, aggiorna i dati) e
+    terminano invece di avviare un secondo ciclo di richieste.
+    """
+
+    # Emesso con la lista dei comandi ricevuti da un'altra istanza
+    commands_received = pyqtSignal(list)
+
+    # Attesa massima (ms) per la comunicazione con l'istanza esistente
+    TIMEOUT = 1000
+
+    def __init__(self, name: str = "GlikNightscoutViewer", parent=None):
+        super().__init__(parent)
+        try:
+            user = getpass.getuser()
+        except Exception:
+            user = ""
+        # Un server per utente: sessioni diverse non interferiscono
+        self.server_name = f"{name}-{user}" if user else name
+        self.server = None
+
+    def send_to_running(self, commands: list) -> bool:
+        """
+        Invia i comandi all'istanza già in esecuzione
+
+        Returns:
+            True se un'altra istanza ha ricevuto i comandi
+        """
+        socket = QLocalSocket()
+        socket.connectToServer(self.server_name)
+        if not socket.waitForConnected(self.TIMEOUT):
+            return False
+
+        socket.write(" ".join(commands).encode("utf-8") + b"\n")
+        socket.flush()
+        socket.waitForBytesWritten(self.TIMEOUT)
+        socket.disconnectFromServer()
+        return True
+
+    def _is_running(self) -> bool:
+        """Verifica se un'altra istanza risponde sul server locale"""
+        socket = QLocalSocket()
+        socket.connectToServer(self.server_name)
+        if not socket.waitForConnected(self.TIMEOUT):
+            return False
+        socket.disconnectFromServer()
+        return True
+
+    def listen(self) -> bool:
+        """
+        Apre il server locale per ricevere i comandi delle nuove istanze
+
+        Returns:
+            True se il server è in ascolto; False se non è stato possibile,
+            anche perché un'altra istanza si è avviata nel frattempo
+        """
+        self.server = QLocalServer(self)
+        self.server.newConnection.connect(self._on_new_connection)
+        if self.server.listen(self.server_name):
+            return True
+
+        if self.server.serverError() == QAbstractSocket.AddressInUseError:
+            if self._is_running():
+                # Due avvii contemporanei (es. avvio automatico e manuale):
+                # il socket appartiene all'altra istanza e non va rimosso
+                self.server.deleteLater()
+                self.server = None
+                return False
+            # Un socket rimasto da un'istanza terminata in modo anomalo
+            # impedisce l'ascolto: rimuovilo e riprova
+            QLocalServer.removeServer(self.server_name)
+            if self.server.listen(self.server_name):
+                return True
+
+        print(f"Impossibile avviare il controllo di istanza unica: {self.server.errorString()}")
+        return False
+
+    def _on_new_connection(self):
+        """Accetta la connessione di una nuova istanza"""
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            socket.readyRead.connect(lambda socket=socket: self._read_commands(socket))
+            socket.disconnected.connect(socket.deleteLater)
+
+    def _read_commands(self, socket):
+        """Legge i comandi completi (uno per riga) e li pubblica"""
+        while socket.canReadLine():
+            line = bytes(socket.readLine()).decode("utf-8", errors="ignore").strip()
+            if line:
+                self.commands_received.emit(line.split())
+
+    def close(self):
+        """Chiude il server locale"""
+        if self.server:
+            self.server.close()
+            self.server = None
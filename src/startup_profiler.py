@@ -0,0 +1,77 @@
+"""
+Glik - A Nightscout desktop viewer
+Copyright (C) 2025 Emmanuele Pani
+
+Misura della durata delle fasi di avvio (--profile-startup)
+"""
+
+import time
+
+# Istante di riferimento: il modulo viene importato per primo da main.py
+_PROCESS_START = time.perf_counter()
+
+
+class StartupProfiler:
+    """
+    Registra la durata delle fasi di avvio
+
+    Le misure vengono sempre registrate (costano pochi microsecondi), ma
+    il resoconto viene stampato solo se il profilo è stato abilitato. Il
+    resoconto parte quando tutte le fasi iniziate sono concluse e almeno
+    il primo caricamento dei dati è terminato.
+    """
+
+    # Fase che deve concludersi prima di stampare il resoconto
+    FINAL_PHASE = "first fetch"
+
+    def __init__(self, start: float = _PROCESS_START):
+        self.enabled = False
+        self.start = start
+        self._begun = {}
+        self._phases = []
+        self._reported = False
+
+    def enable(self):
+        """Abilita la stampa del resoconto"""
+        self.enabled = True
+
+    def begin(self, phase: str):
+        """Segna l'inizio di una fase (solo la prima volta)"""
+        if phase in self._begun or self._is_done(phase):
+            return
+        self._begun[phase] = time.perf_counter()
+
+    def end(self, phase: str):
+        """Segna la fine di una fase iniziata (solo la prima volta)"""
+        started = self._begun.pop(phase, None)
+        if started is None:
+            return
+        now = time.perf_counter()
+        self._phases.append((phase, now - started, now - self.start))
+        self._maybe_report()
+
+    def discard(self, phase: str):
+        """Rinuncia a misurare una fase (es. nessun disegno se avviato nel tray)"""
+        self._begun.pop(phase, None)
+        self._maybe_report()
+
+    def _is_done(self, phase: str) -> bool:
+        return any(name == phase for name, _, _ in self._phases)
+
+    def _maybe_report(self):
+        if self._reported or self._begun or not self._is_done(self.FINAL_PHASE):
+            return
+        self._reported = True
+        if self.enabled:
+            print(self.report())
+
+    def report(self) -> str:
+        """Resoconto delle fasi misurate"""
+        lines = ["Profilo di avvio:"]
+        for phase, duration, since_start in self._phases:
+            lines.append(f"  {phase:<16}{duration * 1000:8.1f} ms  (a {since_start * 1000:.1f} ms dall'avvio)")
+        return "\n".join(lines)
+
+
+# Istanza condivisa dall'intera applicazione
+profiler = StartupProfiler()
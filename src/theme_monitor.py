@@ -0,0 +1,68 @@
+"""
+Glik - A Nightscout desktop viewer
+Copyright (C) 2025 Emmanuele Pani
+
+Rilevamento del tema del sistema operativo basato su eventi
+"""
+
+import threading
+
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtWidgets import QApplication
+import darkdetect
+
+
+class ThemeMonitor(QObject):
+    """
+    Tiene traccia del tema (chiaro/scuro) del sistema
+
+    Il tema viene letto una sola volta all'avvio; i cambiamenti arrivano
+    dal listener di darkdetect, in un thread in background, e dagli
+    eventi di cambio palette di Qt. Il segnale 'theme_changed' viene
+    emesso solo quando il tema cambia davvero.
+    """
+
+    # Emesso con True se il nuovo tema è scuro
+    theme_changed = pyqtSignal(bool)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.dark = self._detect()
+
+        # Listener del sistema operativo, se supportato dalla piattaforma
+        self._thread = threading.Thread(target=self._listen, name="ThemeMonitor", daemon=True)
+        self._thread.start()
+
+        # Ripiego: i cambi di palette segnalati da Qt
+        app = QApplication.instance()
+        if app:
+            app.paletteChanged.connect(self._on_palette_changed)
+
+    @staticmethod
+    def _detect() -> bool:
+        """Legge il tema corrente dal sistema"""
+        try:
+            return bool(darkdetect.isDark())
+        except Exception:
+            return False
+
+    def _listen(self):
+        """Attende le notifiche di cambio tema dal sistema operativo"""
+        try:
+            darkdetect.listener(self._on_system_theme)
+        except Exception as e:
+            print(f"Notifiche del tema non disponibili: {e}")
+
+    def _on_system_theme(self, theme):
+        """Gestisce la notifica del listener ('Dark' o 'Light')"""
+        self._update(str(theme).lower() == "dark")
+
+    def _on_palette_changed(self, *args):
+        """Rilegge il tema quando Qt segnala un cambio di palette"""
+        self._update(self._detect())
+
+    def _update(self, dark: bool):
+        """Pubblica il nuovo tema se è cambiato"""
+        if dark != self.dark:
+            self.dark = dark
+            self.theme_changed.emit(dark)
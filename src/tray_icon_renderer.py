@@ -0,0 +1,105 @@
+"""
+Glik - A Nightscout desktop viewer
+Copyright (C) 2025 Emmanuele Pani
+
+Disegno delle icone del system tray con cache
+"""
+
+from collections import OrderedDict
+
+from PyQt5.QtGui import QIcon, QPixmap, QPainter, QFont, QPen, QColor
+from PyQt5.QtCore import Qt
+
+
+class TrayIconRenderer:
+    """
+    Disegna l'icona del tray con il valore glicemico
+
+    Le icone già disegnate sono conservate in una cache LRU indicizzata
+    per testo, tema e densità dello schermo: quando il valore non cambia
+    l'aggiornamento si riduce a una ricerca nel dizionario.
+    """
+
+    # Numero massimo di icone conservate
+    CACHE_SIZE = 64
+    # Lato dell'icona in pixel logici
+    ICON_SIZE = 32
+
+    def __init__(self):
+        self._cache = OrderedDict()
+
+    def icon(self, glucose_value, dark: bool, device_pixel_ratio: float = 1.0) -> QIcon:
+        """
+        Restituisce l'icona per il valore indicato, disegnandola solo se non è in cache
+
+        Args:
+            glucose_value: Valore glicemico da mostrare
+            dark: True se il tema del sistema è scuro
+            device_pixel_ratio: Densità dello schermo
+        """
+        # Converti il valore in stringa
+        text = str(glucose_value)
+        if len(text) > 3:
+            text = text[:3]
+
+        key = (text, dark, device_pixel_ratio)
+        icon = self._cache.get(key)
+        if icon is not None:
+            self._cache.move_to_end(key)
+            return icon
+
+        icon = self._render(text, dark, device_pixel_ratio)
+        self._cache[key] = icon
+        if len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return icon
+
+    def _render(self, text: str, dark: bool, device_pixel_ratio: float) -> QIcon:
+        """Disegna l'icona con il testo indicato"""
+        size = self.ICON_SIZE
+        pixmap = QPixmap(int(size * device_pixel_ratio), int(size * device_pixel_ratio))
+        pixmap.setDevicePixelRatio(device_pixel_ratio)
+        pixmap.fill(Qt.transparent)
+
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        # Imposta il font in base alla lunghezza del valore
+        if len(text) <= 2:
+            font_size = 24
+        elif len(text) == 3:
+            font_size = 22
+        else:
+            font_size = 20
+
+        # Imposta il font
+        font = QFont("Arial", font_size, QFont.Bold)
+        painter.setFont(font)
+
+        # Calcola il rettangolo del testo
+        text_rect = painter.fontMetrics().boundingRect(text)
+
+        # Calcola il fattore di scala per adattare il testo mantenendo le proporzioni
+        scale_w = (size - 1) / text_rect.width()   # Usa quasi tutto lo spazio disponibile
+        scale_h = (size - 1) / text_rect.height()  # Usa quasi tutto lo spazio disponibile
+        scale = min(scale_w, scale_h)  # Usa il fattore più piccolo per mantenere le proporzioni
+
+        # Applica la trasformazione per centrare perfettamente
+        painter.translate(size / 2, size / 2)  # Sposta al centro dell'icona
+        painter.scale(scale, scale)  # Scala il testo
+        painter.translate(-text_rect.width()/2, text_rect.height()/3)  # Aggiustato per centrare verticalmente
+
+        # Tema scuro: contorno e numero bianchi; tema chiaro: neri
+        text_color = QColor(255, 255, 255) if dark else QColor(0, 0, 0)
+
+        # Disegna il contorno
+        painter.setPen(QPen(text_color, 4))
+        painter.drawText(0, 0, text)
+
+        # Disegna il valore
+        painter.setPen(text_color)
+        painter.drawText(0, 0, text)
+
+        painter.end()
+
+        return QIcon(pixmap)
@@ -21,16 +21,14 @@ from PyQt5.QtWidgets import (QDialog, QLabel, QLineEdit, QPushButton,
 from PyQt5.QtCore import Qt
 import json
 import os
-from PyQt5.QtGui import QIcon
-from PyQt5.QtGui import QPixmap
-from .crypto import ConfigCrypto
-from .resources import get_logo_path, get_icon_path
+from .config_store import ConfigStore, DEFAULT_CONFIG
+from .resources import get_icon, get_logo_pixmap
 
 class WelcomeDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Benvenuto in Glik")
-        self.setWindowIcon(QIcon(get_icon_path()))
+        self.setWindowIcon(get_icon())
         self.setModal(True)
         self.setStyleSheet("""
             QDialog {
@@ -65,8 +63,7 @@ class WelcomeDialog(QDialog):
         
         # Logo
         logo_label = QLabel()
-        logo = QPixmap(get_logo_path())
-        logo_label.setPixmap(logo.scaled(128, 128, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        logo_label.setPixmap(get_logo_pixmap(128))
         logo_label.setAlignment(Qt.AlignCenter)
         layout.addWidget(logo_label)
         
@@ -174,47 +171,19 @@ class WelcomeDialog(QDialog):
     @staticmethod
     def show_if_first_time():
         """Mostra il dialog solo se non esiste già un file di configurazione in APPDATA"""
-        import sys
-        import os.path
+        store = ConfigStore()
         
-        crypto = ConfigCrypto()
+        # Se esiste un file di configurazione, caricalo (migrando quello in chiaro)
+        if os.path.exists(store.path):
+            store.load()
+            return False
         
-        # Usa sempre APPDATA per i file di configurazione
-        config_dir = os.path.join(os.getenv('APPDATA'), 'Glik')
-        os.makedirs(config_dir, exist_ok=True)
-        config_path = os.path.join(config_dir, "config.json")
+        # Salva la configurazione di default
+        store.save(DEFAULT_CONFIG, immediate=True)
         
-        # Se esiste un file di configurazione, prova a migrarlo
-        if os.path.exists(config_path):
-            crypto.migrate_config(config_path)
-            return False
-            
-        if not os.path.exists(config_path):
-            default_config = {
-                "connection_type": "Nightscout",
-                "nightscout_url": "",
-                "api_secret": "",
-                "api_secret_sha1": "",
-                "dexcom_username": "",
-                "dexcom_password": "",
-                "dexcom_region": "ous",
-                "dark_mode": True,
-                "minimize_to_tray": True,
-                "refresh_interval": 30,
-                "autostart": False
-            }
-            
-            # Cifra e salva la configurazione di default
-            encrypted_config = crypto.encrypt_config(default_config)
-            with open(config_path, "w") as f:
-                f.write(encrypted_config)
-            
-            dialog = WelcomeDialog()
-            if dialog.exec_() == QDialog.Accepted:
-                config = dialog.get_config()
-                # Cifra e salva la nuova configurazione
-                encrypted_config = crypto.encrypt_config(config)
-                with open(config_path, "w") as f:
-                    f.write(encrypted_config)
-                return True
-        return False 
\ No newline at end of file
+        dialog = WelcomeDialog()
+        if dialog.exec_() == QDialog.Accepted:
+            # Cifra e salva la nuova configurazione
+            store.save(dialog.get_config(), immediate=True)
+            return True
+        return False
@@ -0,0 +1,151 @@
+"""
+Glik - A Nightscout desktop viewer
+Copyright (C) 2025 Emmanuele Pani
+
+Prova del canale in tempo reale contro un server socket.io locale
+"""
+
+import io
+import threading
+import time
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIServer, WSGIRequestHandler, make_server
+
+import pytest
+
+socketio = pytest.importorskip("socketio")
+QtCore = pytest.importorskip("PyQt5.QtCore")
+
+from src.nightscout_stream import NightscoutStream
+from src.poll_scheduler import PollScheduler
+
+# Attesa massima (secondi) per ogni evento atteso
+TIMEOUT = 10
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _WebSocketRequestHandler(WSGIRequestHandler):
+    """Espone il socket della richiesta, come fa Werkzeug, per l'upgrade a websocket"""
+
+    def get_environ(self):
+        environ = super().get_environ()
+        environ["werkzeug.socket"] = self.connection
+        return environ
+
+    def get_stderr(self):
+        # wsgiref non sa che la connessione è passata al websocket e
+        # segnala un errore quando questa viene chiusa
+        return io.StringIO()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer:
+    """Server locale che imita il canale socket di Nightscout"""
+
+    def __init__(self):
+        self.sio = socketio.Server(async_mode="threading")
+        self.clients = []
+        self.sio.on("connect", self._on_connect)
+        self.sio.on("authorize", self._on_authorize)
+        self.httpd = make_server("127.0.0.1", 0, socketio.WSGIApp(self.sio),
+                                 server_class=_ThreadingWSGIServer,
+                                 handler_class=_WebSocketRequestHandler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def _on_connect(self, sid, environ):
+        self.clients.append(sid)
+
+    def _on_authorize(self, sid, data):
+        return {"read": True}
+
+    def send_reading(self, mills, mgdl):
+        """Invia una lettura a tutti i client, come 'dataUpdate' di Nightscout"""
+        self.sio.emit("dataUpdate", {"sgvs": [{"mills": mills, "mgdl": mgdl, "direction": "Flat"}]})
+
+    def drop_clients(self):
+        """Chiude le connessioni dal lato del server"""
+        for sid in list(self.clients):
+            self.sio.disconnect(sid)
+        self.clients.clear()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def app():
+    return QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+
+@pytest.fixture
+def server():
+    server = StandInServer()
+    server.thread.start()
+    yield server
+    server.close()
+
+
+def wait_until(app, condition):
+    """Elabora gli eventi Qt finché la condizione non è vera"""
+    deadline = time.monotonic() + TIMEOUT
+    while not condition():
+        assert time.monotonic() < deadline, "evento atteso non ricevuto"
+        app.processEvents()
+        time.sleep(0.01)
+
+
+def test_entries_arrive_and_polling_resumes(app, server):
+    scheduler = PollScheduler(30)
+    polls = []
+    scheduler.poll.connect(lambda: polls.append(time.monotonic()))
+    scheduler.schedule_next()
+    stream = NightscoutStream(server.url, "")
+    received = []
+    stream.entries_received.connect(received.extend)
+    stream.connected.connect(lambda: scheduler.set_streaming(True))
+    stream.disconnected.connect(lambda: scheduler.set_streaming(False))
+    stream.start()
+    try:
+        # Con il canale connesso resta solo il controllo di sicurezza
+        wait_until(app, lambda: scheduler.streaming)
+        assert scheduler.next_delay(time.time()) == PollScheduler.STREAMING_INTERVAL
+
+        server.send_reading(1700000000000, 123)
+        wait_until(app, lambda: received)
+        assert received[0]["sgv"] == 123
+        assert received[0]["date"] == 1700000000000
+
+        # Quando il canale cade si torna subito al polling
+        server.drop_clients()
+        wait_until(app, lambda: not scheduler.streaming)
+        dropped = time.monotonic()
+        wait_until(app, lambda: polls)
+        assert polls[0] - dropped < 2
+    finally:
+        stream.stop()
+
+
+def test_stop_emits_nothing(app, server):
+    stream = NightscoutStream(server.url, "")
+    events = []
+    stream.connected.connect(lambda: events.append("connected"))
+    stream.disconnected.connect(lambda: events.append("disconnected"))
+    stream.start()
+    thread = stream._thread
+    # Fermato mentre è ancora in connessione: il thread deve terminare
+    stream.stop()
+    assert not thread.is_alive()
+
+    server.send_reading(1700000000000, 123)
+    deadline = time.monotonic() + 1
+    while time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    assert events == []